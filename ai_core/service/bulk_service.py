@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+def chunk_text(text: str, chunk_tokens: int) -> List[str]:
+    """Split text into chunks of about `chunk_tokens`, on paragraph boundaries."""
+    from util.llm.router import estimate_tokens
+
+    chunks, current, size = [], [], 0
+    for paragraph in (p for p in re.split(r"\n\s*\n", text) if p.strip()):
+        tokens = estimate_tokens(paragraph)
+        if current and size + tokens > chunk_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(paragraph)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+# -- Manifest --
+class BulkManifest:
+    """
+    Append-only JSONL journal of a bulk run.
+    Every finished chunk and document is one line, so a crashed run resumes without re-spending tokens.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        self._apply(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A crash may leave a truncated last line
+                        continue
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        doc = self.documents.setdefault(event["doc"], {"status": "pending", "chunks": {}})
+        if event["event"] == "start":
+            # A changed file or chunking invalidates earlier chunk results
+            if doc.get("fingerprint") != event["fingerprint"]:
+                doc.update(status="pending", chunks={})
+            doc["fingerprint"] = event["fingerprint"]
+        elif event["event"] == "chunk":
+            doc["chunks"][event["chunk"]] = event["result"]
+        elif event["event"] in ("done", "failed"):
+            doc["status"] = event["event"]
+            doc["error"] = event.get("error")
+
+    def record(self, **event) -> None:
+        self._apply(event)
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def is_done(self, doc: str, fingerprint: str) -> bool:
+        entry = self.documents.get(doc)
+        return bool(entry) and entry["status"] == "done" and entry.get("fingerprint") == fingerprint
+
+    def chunk_result(self, doc: str, chunk: str) -> Optional[Any]:
+        return self.documents.get(doc, {}).get("chunks", {}).get(chunk)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# -- Runner --
+class BulkJobRunner:
+    """
+    Summarizes or translates every supported document under a directory.
+
+    - Extraction runs in a process pool, LLM calls in a thread pool of `max_concurrency` workers
+      (provider clients are blocking; the default asyncio executor would cap them at min(32, cpus + 4))
+    - Text is compacted, then chunked; every chunk result is checkpointed to the manifest
+    - Reports docs/minute and tokens/minute
+    """
+    def __init__(
+        self,
+        task: str,
+        llm_type: str,
+        llm_api_key: str,
+        llm_model_name: Optional[str] = None,
+        source_language: str = "auto",
+        target_language: str = "english",
+        chunk_tokens: int = 6000,
+        max_concurrency: int = 8,
+        extract_workers: Optional[int] = None
+    ) -> None:
+        assert task in ("summarize", "translate"), "task must be 'summarize' or 'translate'"
+        self.task = task
+        self.llm_type = llm_type.lower()
+        self.llm_model_name = llm_model_name
+        self.source_language = source_language
+        self.target_language = target_language
+        self.chunk_tokens = chunk_tokens
+        self.max_concurrency = max_concurrency
+        self.extract_workers = extract_workers or os.cpu_count()
+
+        if task == "summarize":
+            from summarization_service import OverviewSummarization
+            self.service = OverviewSummarization(llm_type=llm_type, llm_api_key=llm_api_key)
+        else:
+            from translation_service import TranslationService
+            self.service = TranslationService(llm_type=llm_type, llm_api_key=llm_api_key)
+
+        self.stats = {
+            "documents": 0,
+            "skipped": 0,
+            "failed": 0,
+            "chunks_run": 0,
+            "chunks_resumed": 0,
+            "cancelled": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def _call_llm(self, text: str, context: Optional[Any] = None) -> str:
+        """One blocking LLM call for one chunk."""
+        if self.task == "translate":
+            response = self.service.translate(
+                llm_model_name=self.llm_model_name,
+                instructions="You are a document content translator.",
+                prompt_inputs={
+                    "source_language": self.source_language,
+                    "target_language": self.target_language,
+                    "pdf_text": text
+                },
+                context=context
+            )
+            return response["translation"]
+
+        from pydantic import BaseModel
+
+        class SummaryOutputModel(BaseModel):
+            markdown_content: str
+            followup_questions: List[str]
+
+        response = self.service.summarize(
+            llm_model_name=self.llm_model_name,
+            instructions="You are a summarization expert.",
+            output_model=SummaryOutputModel,
+            prompt_inputs={
+                "pdf_text": text,
+                "num_core_points": 5,
+                "num_detailed_points": 3,
+                "num_followup_questions": 3
+            },
+            prompt_config={
+                "prompt_category": "overview",
+                "prompt_worker": "summarizer",
+                "prompt_type": "short"
+            },
+            context=context
+        )
+        return response["markdown_content"]
+
+    async def _run_chunk(
+        self,
+        manifest: BulkManifest,
+        doc: str,
+        key: str,
+        text: str,
+        llm_pool: ThreadPoolExecutor,
+        llm_slots: asyncio.Semaphore,
+        context: Optional[Any] = None
+    ) -> str:
+        from util.llm.router import estimate_tokens
+        from util.request_context import check_context
+
+        cached = manifest.chunk_result(doc, key)
+        if cached is not None:
+            self.stats["chunks_resumed"] += 1
+            return cached
+        async with llm_slots:
+            # Chunks still waiting for a slot are skipped once the run is cancelled
+            check_context(context)
+            result = await asyncio.get_running_loop().run_in_executor(llm_pool, self._call_llm, text, context)
+        manifest.record(event="chunk", doc=doc, chunk=key, result=result)
+        self.stats["chunks_run"] += 1
+        self.stats["input_tokens"] += estimate_tokens(text)
+        self.stats["output_tokens"] += estimate_tokens(result)
+        return result
+
+    async def _run_document(
+        self,
+        manifest: BulkManifest,
+        pool: ProcessPoolExecutor,
+        llm_pool: ThreadPoolExecutor,
+        input_dir: str,
+        output_dir: str,
+        path: str,
+        doc_slots: asyncio.Semaphore,
+        llm_slots: asyncio.Semaphore,
+        context: Optional[Any] = None
+    ) -> None:
+        from pdf_service import extract_text
+        from util.request_context import RequestCancelled, check_context
+        from util.text.compaction import DocumentCompactor
+
+        doc = os.path.relpath(path, input_dir)
+        stat = os.stat(path)
+        # Anything that changes the output invalidates checkpoints: file, task, provider/model, languages, chunking
+        fingerprint = ":".join(str(part) for part in (
+            stat.st_size, int(stat.st_mtime), self.task, self.llm_type, self.llm_model_name or "routed",
+            self.source_language, self.target_language, self.chunk_tokens
+        ))
+        if manifest.is_done(doc, fingerprint):
+            self.stats["skipped"] += 1
+            return
+
+        async with doc_slots:
+            try:
+                # Documents still waiting for a slot are skipped once the run is cancelled
+                check_context(context)
+                manifest.record(event="start", doc=doc, fingerprint=fingerprint)
+                text = await asyncio.get_running_loop().run_in_executor(pool, extract_text, path)
+                text = DocumentCompactor(exact=self.task == "translate").compact(text)
+                chunks = chunk_text(text, self.chunk_tokens)
+                results = await asyncio.gather(*(
+                    self._run_chunk(manifest, doc, str(i), chunk, llm_pool, llm_slots, context)
+                    for i, chunk in enumerate(chunks)
+                ))
+                if self.task == "summarize" and len(results) > 1:
+                    # Reduce step: summary of the chunk summaries
+                    output = await self._run_chunk(
+                        manifest, doc, "reduce", "\n\n".join(results), llm_pool, llm_slots, context
+                    )
+                else:
+                    output = "\n\n".join(results)
+
+                suffix = ".summary.md" if self.task == "summarize" else f".{self.target_language}.md"
+                out_path = os.path.join(output_dir, doc) + suffix
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                with open(out_path, "w", encoding="utf-8") as file:
+                    file.write(output)
+                manifest.record(event="done", doc=doc, output=out_path)
+                self.stats["documents"] += 1
+            except RequestCancelled:
+                # Not recorded as failed: finished chunks stay checkpointed and the next run resumes
+                self.stats["cancelled"] += 1
+            except Exception as e:
+                manifest.record(event="failed", doc=doc, error=str(e))
+                self.stats["failed"] += 1
+                print(f"Failed: {doc}: {e}")
+
+    async def run_async(self, input_dir: str, output_dir: str, context: Optional[Any] = None) -> Dict[str, Any]:
+        from pdf_service import PdfProcessor
+
+        os.makedirs(output_dir, exist_ok=True)
+        paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(input_dir)
+            for name in names
+            if name.lower().endswith(PdfProcessor.SUPPORTED_EXTENSIONS)
+        )
+        manifest = BulkManifest(os.path.join(output_dir, "manifest.jsonl"))
+        doc_slots = asyncio.Semaphore(self.max_concurrency * 2)
+        llm_slots = asyncio.Semaphore(self.max_concurrency)
+
+        start = time.monotonic()
+        try:
+            with ProcessPoolExecutor(max_workers=self.extract_workers) as pool, \
+                    ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="bulk-llm") as llm_pool:
+                await asyncio.gather(*(
+                    self._run_document(
+                        manifest, pool, llm_pool, input_dir, output_dir, path, doc_slots, llm_slots, context
+                    )
+                    for path in paths
+                ))
+        finally:
+            manifest.close()
+        minutes = max(time.monotonic() - start, 1e-9) / 60
+        tokens = self.stats["input_tokens"] + self.stats["output_tokens"]
+        return {
+            **self.stats,
+            "total_files": len(paths),
+            "elapsed_seconds": minutes * 60,
+            "docs_per_minute": self.stats["documents"] / minutes,
+            "tokens_per_minute": tokens / minutes,
+            "context": context.get_stats() if context is not None else None,
+        }
+
+    def run(self, input_dir: str, output_dir: str, context: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Process every document under `input_dir`; resumes from `output_dir`/manifest.jsonl if present.
+        Pass `context` (util.request_context.RequestContext) to bound the run with a deadline or cancel it;
+        in-flight calls are aborted and unfinished documents are picked up by the next run.
+        """
+        return asyncio.run(self.run_async(input_dir, output_dir, context))
+
+
+# usage
+# python bulk_service.py ./docs ./out --task summarize --llm-type mock
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize or translate every document in a directory.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--task", choices=["summarize", "translate"], default="summarize")
+    parser.add_argument("--llm-type", default="mock")
+    parser.add_argument("--model", default=None, help="Model name; routed automatically if omitted.")
+    parser.add_argument("--api-key-env", default=None, help="Environment variable holding the API key.")
+    parser.add_argument("--source-language", default="auto")
+    parser.add_argument("--target-language", default="english")
+    parser.add_argument("--chunk-tokens", type=int, default=6000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--extract-workers", type=int, default=None)
+    parser.add_argument("--deadline-seconds", type=float, default=None, help="Stop the run (resumable) after this long.")
+    args = parser.parse_args()
+
+    api_key = "mock"
+    if args.api_key_env:
+        from dotenv import load_dotenv
+        load_dotenv()
+        api_key = os.getenv(args.api_key_env)
+
+    runner = BulkJobRunner(
+        task=args.task,
+        llm_type=args.llm_type,
+        llm_api_key=api_key,
+        llm_model_name=args.model,
+        source_language=args.source_language,
+        target_language=args.target_language,
+        chunk_tokens=args.chunk_tokens,
+        max_concurrency=args.concurrency,
+        extract_workers=args.extract_workers
+    )
+    from util.request_context import RequestContext
+    context = RequestContext(deadline_seconds=args.deadline_seconds)
+    print(json.dumps(runner.run(args.input_dir, args.output_dir, context=context), indent=2))
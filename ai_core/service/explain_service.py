@@ -6,7 +6,8 @@ class ExplainService:
     def __init__(
         self,
         llm_type: str,
-        llm_api_key: str
+        llm_api_key: str,
+        router: Optional[Any] = None
     ) -> None:
         # Initialize client
         try:
@@ -15,23 +16,33 @@ class ExplainService:
                 llm_type=llm_type,
                 api_key=llm_api_key
             )
+            self.llm_type = llm_type.lower()
+            # Model router, used when `llm_model_name` is None
+            from util.llm.router import get_router
+            self.router = router or get_router(mode="general")
         except Exception as e:
             raise ValueError(f"Failed to initialize LLM: {e}")
     
     def explain(
         self,
-        llm_model_name: str,
+        llm_model_name: Optional[str],
         instructions: str,
         prompt_inputs: Dict[str, Any],
         prompt_config: Dict[str, Any] = {
             'prompt_category': 'quick_access',
             'prompt_worker': 'explainer',
             'prompt_type': 'quick'
-        }
+        },
+        latency_slo: Optional[float] = None,
+        context: Optional[Any] = None,
+        highlighter: Optional[Any] = None
     ) -> dict:
         """
         Explain the provided inputs using the configured LLM and prompt.
+        Pass `context` (util.request_context.RequestContext) to abort when the client goes away.
+        Pass `highlighter` (highlight_service.HighlightService) to get the source paragraph ids as 'highlights'.
         """
+        from util.request_context import RequestCancelled
         try:
             # Fetch the prompt 
             from util.prompt.get_prompt import PromptService
@@ -39,25 +50,42 @@ class ExplainService:
                 prompt_category=prompt_config['prompt_category'],
                 prompt_worker=prompt_config['prompt_worker'],
                 prompt_type=prompt_config['prompt_type'],
-                inputs=prompt_inputs
+                inputs=prompt_inputs,
+                context=context
             )
             assert prompt, "Prompt not found for the given configuration"
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to fetch prompt: {e}")
         
         try:
             # Generate explanation using the LLM
-            generated_text = self.llm.generate(
-                message=prompt,
-                model_name=llm_model_name,
-                instructions=instructions
-            )
+            if llm_model_name:
+                generated_text = self.llm.generate(
+                    message=prompt,
+                    model_name=llm_model_name,
+                    instructions=instructions,
+                    context=context
+                )
+            else:
+                generated_text = self.router.generate(
+                    llms={self.llm_type: self.llm},
+                    message=prompt,
+                    instructions=instructions,
+                    latency_slo=latency_slo,
+                    context=context
+                )
             assert generated_text, "LLM response cannot be empty. Please check the LLM configuration."
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to generate explanation: {e}")
         response = {
             'explanation': generated_text,
         }
+        if highlighter is not None:
+            response['highlights'] = [hit['para_id'] for hit in highlighter.match(generated_text)]
         return response
 
         
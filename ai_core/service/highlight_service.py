@@ -0,0 +1,209 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Tuple, Union
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; punctuation and whitespace are ignored."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _shingles(tokens: List[str], size: int) -> List[int]:
+    """Hashed word shingles of `size` consecutive tokens."""
+    if len(tokens) < size:
+        return [hash(tuple(tokens))] if tokens else []
+    return [hash(tuple(tokens[i:i + size])) for i in range(len(tokens) - size + 1)]
+
+
+# -- Index --
+class HighlightService:
+    """
+    Maps generated answer text (explain / voice flow) back to source paragraph ids,
+    so the frontend can highlight paragraphs while the answer streams.
+    # NOTE: Build once per document, then call `match` or `open_stream` per answer.
+    # Paragraph ids follow rag_service.DocumentShard, so highlights and retrieval refer to the same paragraphs.
+
+    - Hashed-shingle table: shingle hash -> paragraph ids
+    - Shingles shared by too many paragraphs (boilerplate) are dropped at build time
+    """
+    def __init__(
+        self,
+        paragraphs: Union[List[str], Dict[Hashable, str]],
+        shingle_size: int = 3,
+        max_paragraph_ratio: float = 0.2
+    ) -> None:
+        assert shingle_size >= 1, "shingle_size must be >= 1"
+        if isinstance(paragraphs, dict):
+            items = list(paragraphs.items())
+        else:
+            items = list(enumerate(paragraphs))
+
+        self.shingle_size = shingle_size
+        self.paragraph_ids: List[Hashable] = [para_id for para_id, _ in items]
+        self.table: Dict[int, Tuple[int, ...]] = {}
+        self.stats: Dict[str, Any] = {}
+
+        postings: Dict[int, set] = defaultdict(set)
+        for idx, (_, text) in enumerate(items):
+            for shingle in _shingles(_tokenize(text), shingle_size):
+                postings[shingle].add(idx)
+
+        # Drop shingles common to many paragraphs, they carry no position signal
+        max_paragraphs = max(1, int(len(items) * max_paragraph_ratio))
+        dropped = 0
+        for shingle, para_idx in postings.items():
+            if len(para_idx) > max_paragraphs and len(items) > 1:
+                dropped += 1
+                continue
+            self.table[shingle] = tuple(sorted(para_idx))
+
+        self.stats = {
+            "num_paragraphs": len(items),
+            "num_shingles": len(self.table),
+            "dropped_shingles": dropped,
+            "shingle_size": shingle_size,
+        }
+
+    @classmethod
+    def from_text(cls, pdf_text: str, **kwargs) -> "HighlightService":
+        """Build the index from raw text; pages are split on '\\f', then paragraphs on blank lines."""
+        paragraphs = [
+            paragraph.strip()
+            for page in pdf_text.split("\f")
+            for paragraph in re.split(r"\n\s*\n", page)
+            if paragraph.strip()
+        ]
+        return cls(paragraphs, **kwargs)
+
+    @classmethod
+    def from_shard(cls, shard: Any, **kwargs) -> "HighlightService":
+        """Build the index from the paragraphs of a rag_service.DocumentShard."""
+        return cls(shard.paragraphs, **kwargs)
+
+    def _votes(self, tokens: List[str]) -> Dict[int, int]:
+        votes: Dict[int, int] = defaultdict(int)
+        table = self.table
+        for shingle in _shingles(tokens, self.shingle_size):
+            for idx in table.get(shingle, ()):
+                votes[idx] += 1
+        return votes
+
+    def match(self, text: str, top_k: int = 3, min_hits: int = 2) -> List[Dict[str, Any]]:
+        """
+        Match a piece of generated text to source paragraphs.
+            :param text: Answer text (a full answer or a single chunk).
+            :param top_k: Maximum number of paragraphs to return.
+            :param min_hits: Minimum shared shingles for a paragraph to count as a match.
+            :return: [{'para_id': ..., 'hits': int}] ordered by hits, then document order.
+        """
+        votes = self._votes(_tokenize(text))
+        ranked = sorted(
+            (item for item in votes.items() if item[1] >= min_hits),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [
+            {"para_id": self.paragraph_ids[idx], "hits": hits}
+            for idx, hits in ranked[:top_k]
+        ]
+
+    def open_stream(self, min_hits: int = 2, window: int = 48) -> "HighlightStream":
+        """Start a streaming matcher for one answer."""
+        return HighlightStream(self, min_hits=min_hits, window=window)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return statistics about the index.
+        """
+        return self.stats
+
+
+# -- Streaming --
+class HighlightStream:
+    """
+    Incremental matcher for a streaming answer.
+    Chunks may split words or shingles; a token tail is carried between `feed` calls.
+    Each paragraph is emitted once, in the order the answer reaches it.
+    """
+    def __init__(self, index: HighlightService, min_hits: int = 2, window: int = 48) -> None:
+        self.index = index
+        self.min_hits = min_hits
+        self.window = window
+        self._pending = ""
+        self._tokens: List[str] = []
+        self._emitted: set = set()
+        self.highlighted: List[Hashable] = []
+
+    def feed(self, chunk: str) -> List[Hashable]:
+        """
+        Feed the next answer chunk.
+            :return: Paragraph ids that became highlighted with this chunk.
+        """
+        text = self._pending + chunk
+        # Hold back a trailing partial word until the next chunk completes it
+        match = re.search(r"\w+$", text)
+        if match:
+            self._pending = text[match.start():]
+            text = text[:match.start()]
+        else:
+            self._pending = ""
+        return self._advance(_tokenize(text))
+
+    def close(self) -> List[Hashable]:
+        """Flush the held-back partial word at the end of the answer."""
+        text, self._pending = self._pending, ""
+        return self._advance(_tokenize(text))
+
+    def _advance(self, new_tokens: List[str]) -> List[Hashable]:
+        if not new_tokens:
+            return []
+        size = self.index.shingle_size
+        # Keep the last size-1 tokens so shingles spanning chunks are still seen
+        carry = self._tokens[-(size - 1):] if size > 1 else []
+        self._tokens = (self._tokens + new_tokens)[-self.window:]
+
+        # Votes come from the recent window, so highlights follow the answer
+        window_votes = self.index._votes(self._tokens)
+        new_votes = self.index._votes(carry + new_tokens)
+
+        fresh = []
+        for idx in sorted(new_votes, key=lambda i: (-new_votes[i], i)):
+            if idx in self._emitted or window_votes.get(idx, 0) < self.min_hits:
+                continue
+            self._emitted.add(idx)
+            para_id = self.index.paragraph_ids[idx]
+            self.highlighted.append(para_id)
+            fresh.append(para_id)
+        return fresh
+
+
+# Example Usage
+if __name__ == "__main__":
+    import time
+
+    pdf_text = """
+        Antonio Luna was a Filipino army general and a pharmacist who fought in the Philippine-American War.
+
+        He organized professional guerrilla soldiers later named the Luna Sharpshooters and the Black Guard.
+
+        His three-tier defense, now known as the Luna Defense Line, gave the American troops a difficult endeavor.
+    """
+    highlighter = HighlightService.from_text(pdf_text)
+    print(highlighter.get_stats())
+
+    answer = (
+        "Luna was a pharmacist who fought in the Philippine-American War. "
+        "Later he built a three-tier defense, now known as the Luna Defense Line."
+    )
+    stream = highlighter.open_stream()
+    start = time.perf_counter()
+    chunks = [answer[i:i + 17] for i in range(0, len(answer), 17)]
+    for chunk in chunks:
+        ids = stream.feed(chunk)
+        if ids:
+            print(f"{chunk!r} -> {ids}")
+    stream.close()
+    elapsed = (time.perf_counter() - start) / len(chunks) * 1e6
+    print(f"highlighted: {stream.highlighted} ({elapsed:.1f} us/chunk)")
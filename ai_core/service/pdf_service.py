@@ -0,0 +1,58 @@
+import os
+from typing import Any, Dict, List
+
+
+class PdfProcessor:
+    """
+    Text extraction for documents opened in the app or processed in bulk.
+    # NOTE: Pages are joined with form feeds ('\\f'), which util/text/compaction.py uses to find page edges.
+
+    - .pdf: requires `pypdf` (imported on first use)
+    - .txt / .md: read as-is, existing form feeds are kept as page breaks
+    """
+    SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+    def __init__(self) -> None:
+        self.stats = {}
+
+    def extract_pages(self, file_path: str) -> List[str]:
+        """Extract the text of every page."""
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in self.SUPPORTED_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {ext}. Supported: {self.SUPPORTED_EXTENSIONS}")
+
+        if ext == ".pdf":
+            try:
+                from pypdf import PdfReader
+            except ImportError as e:
+                raise ValueError(f"PDF extraction requires pypdf: {e}")
+            try:
+                reader = PdfReader(file_path)
+                pages = [page.extract_text() or "" for page in reader.pages]
+            except Exception as e:
+                raise ValueError(f"Failed to extract PDF text: {e}")
+        else:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+                pages = file.read().split("\f")
+
+        self.stats = {
+            "file_path": file_path,
+            "pages": len(pages),
+            "characters": sum(len(page) for page in pages),
+        }
+        return pages
+
+    def extract_text(self, file_path: str) -> str:
+        """Extract the full document text, pages separated by '\\f'."""
+        return "\f".join(self.extract_pages(file_path))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return statistics about the last extraction.
+        """
+        return self.stats
+
+
+def extract_text(file_path: str) -> str:
+    """Module-level helper, picklable for process pools."""
+    return PdfProcessor().extract_text(file_path)
@@ -0,0 +1,299 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+# Prefetched artifacts, in the order they are built
+STAGES = ("text", "index", "highlight", "prompts", "summary")
+
+
+class PrefetchService:
+    """
+    Opt-in speculative precompute when a PDF is opened, so the first summary / voice answer is fast.
+    # NOTE: Runs as low-priority `background` jobs on util/scheduler/job_scheduler.py; interactive work always goes first.
+
+    - text: extraction (pdf_service.PdfProcessor) + compaction
+    - index: retrieval shard (rag_service.DocumentShard), also added to `workspace` if one is given
+      (removed again on `close`; a workspace query that returns the document counts as a use)
+    - highlight: answer -> paragraph matcher (highlight_service.HighlightService) over the shard's paragraphs,
+      pass it to `ExplainService.explain(highlighter=...)`
+    - prompts: pre-rendered overview prompts, pass them to `OverviewSummarization.summarize(prompt=...)`
+    - summary: short overview summary via OverviewSummarization (only if a summarizer is given)
+
+    Every stage is its own scheduler job. While interactive work is queued the next stage is re-submitted
+    after `idle_poll_seconds` instead of holding a worker; after `idle_wait_seconds` it is skipped.
+    Budgets per document: `max_tokens` for the LLM stage, `max_cpu_seconds` across CPU stages.
+    `get` records whether a prefetched result was actually used.
+    """
+    # Stage -> stage whose result it is built from
+    REQUIRES = {"index": "text", "highlight": "index", "prompts": "text", "summary": "prompts"}
+
+    def __init__(
+        self,
+        scheduler: Any,
+        summarizer: Optional[Any] = None,
+        output_model: Any = None,
+        llm_model_name: Optional[str] = None,
+        workspace: Optional[Any] = None,
+        max_tokens: int = 20000,
+        max_cpu_seconds: float = 5.0,
+        idle_check: Optional[Callable[[], bool]] = None,
+        idle_wait_seconds: float = 10.0,
+        idle_poll_seconds: float = 0.05
+    ) -> None:
+        assert summarizer is None or output_model is not None, "output_model is required with a summarizer"
+        self.scheduler = scheduler
+        self.summarizer = summarizer
+        self.output_model = output_model
+        self.llm_model_name = llm_model_name
+        self.workspace = workspace
+        self.max_tokens = max_tokens
+        self.max_cpu_seconds = max_cpu_seconds
+        self.idle_check = idle_check or self._scheduler_idle
+        self.idle_wait_seconds = idle_wait_seconds
+        self.idle_poll_seconds = idle_poll_seconds
+        self.summary_inputs = {"num_core_points": 5, "num_detailed_points": 3, "num_followup_questions": 5}
+
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            stage: {"prefetched": 0, "used": 0, "missed": 0, "skipped": 0, "unused_on_close": 0}
+            for stage in STAGES
+        }
+        self.stats["tokens_spent"] = 0
+        self.stats["cancelled"] = 0
+
+    def _scheduler_idle(self) -> bool:
+        return self.scheduler.get_stats()["queued_chunks"].get("interactive", 0) == 0
+
+    def open(self, doc_id: str, file_path: Optional[str] = None, pdf_text: Optional[str] = None) -> None:
+        """Start prefetching a document. Pass either the file path or already extracted text."""
+        assert file_path or pdf_text, "file_path or pdf_text is required"
+        with self._lock:
+            if doc_id in self._docs:
+                return
+            # Closing the document cancels the context, which aborts an in-flight summary call
+            from util.request_context import RequestContext
+            entry = {
+                "cancelled": False, "results": {}, "used": set(), "cpu_seconds": 0.0, "job": None, "attached": False,
+                "context": RequestContext(), "source": (file_path, pdf_text), "waiting_since": None
+            }
+            self._docs[doc_id] = entry
+        self._submit(doc_id, entry, 0)
+
+    def _submit(self, doc_id: str, entry: Dict[str, Any], stage_index: int) -> None:
+        with self._lock:
+            if entry["cancelled"]:
+                return
+        try:
+            entry["job"] = self.scheduler.submit(
+                self._run, doc_id, entry, stage_index,
+                priority="background",
+                group=doc_id,
+                context=entry["context"]
+            )
+        except RuntimeError as e:
+            print(f"Prefetch not scheduled for {doc_id}: {e}")
+
+    def _run(self, doc_id: str, entry: Dict[str, Any], stage_index: int, context: Optional[Any] = None) -> None:
+        from util.request_context import RequestCancelled
+        for index in range(stage_index, len(STAGES)):
+            stage = STAGES[index]
+            if entry["cancelled"]:
+                return
+            if stage == "summary" and self.summarizer is None:
+                return
+            if not self.idle_check():
+                if entry["waiting_since"] is None:
+                    entry["waiting_since"] = time.monotonic()
+                if time.monotonic() - entry["waiting_since"] <= self.idle_wait_seconds:
+                    # Give the worker back, try this stage again as a new background job
+                    timer = threading.Timer(self.idle_poll_seconds, self._submit, (doc_id, entry, index))
+                    timer.daemon = True
+                    timer.start()
+                    return
+                entry["waiting_since"] = None
+                self._skip(stage)
+                continue
+            entry["waiting_since"] = None
+            try:
+                self._run_stage(doc_id, entry, stage, context)
+            except RequestCancelled:
+                return
+            except Exception as e:
+                print(f"Prefetch {stage} failed for {doc_id}: {e}")
+
+    def _run_stage(self, doc_id: str, entry: Dict[str, Any], stage: str, context: Optional[Any]) -> None:
+        results = entry["results"]
+        required = self.REQUIRES.get(stage)
+        if required is not None and required not in results:
+            # Its input was skipped (budget, timeout) or failed
+            self._skip(stage)
+            return
+
+        if stage == "summary":
+            from util.llm.router import estimate_tokens
+            prompt = results["prompts"]["short_summary"]
+            prompt_tokens = estimate_tokens(prompt)
+            if prompt_tokens > self.max_tokens:
+                self._skip(stage)
+                return
+            summary = self.summarizer.summarize(
+                llm_model_name=self.llm_model_name,
+                instructions="You are a summarization expert.",
+                output_model=self.output_model,
+                prompt_inputs={"pdf_text": results["text"], **self.summary_inputs},
+                prompt_config={
+                    "prompt_category": "overview",
+                    "prompt_worker": "summarizer",
+                    "prompt_type": "short"
+                },
+                prompt=prompt,
+                context=context
+            )
+            self._mark_used(entry, "prompts")
+            with self._lock:
+                self.stats["tokens_spent"] += prompt_tokens + estimate_tokens(str(summary))
+            self._store(entry, stage, summary)
+            return
+
+        if entry["cpu_seconds"] > self.max_cpu_seconds:
+            self._skip(stage)
+            return
+        start = time.thread_time()
+        if stage == "text":
+            result = self._build_text(*entry["source"])
+        elif stage == "index":
+            result = self._build_index(doc_id, entry, results["text"])
+        elif stage == "highlight":
+            from highlight_service import HighlightService
+            result = HighlightService.from_shard(results["index"])
+        else:
+            result = self._build_prompts(results["text"], context)
+        entry["cpu_seconds"] += time.thread_time() - start
+        self._store(entry, stage, result)
+
+    @staticmethod
+    def _build_text(file_path: Optional[str], pdf_text: Optional[str]) -> str:
+        from util.text.compaction import DocumentCompactor
+        if pdf_text is None:
+            from pdf_service import PdfProcessor
+            pdf_text = PdfProcessor().extract_text(file_path)
+        return DocumentCompactor().compact(pdf_text)
+
+    def _build_index(self, doc_id: str, entry: Dict[str, Any], text: str) -> Any:
+        from rag_service import build_shard
+        shard = build_shard(doc_id, text)
+        if self.workspace is not None:
+            # Under the lock, so a concurrent `close` either sees the shard attached or stops the attach
+            with self._lock:
+                if not entry["cancelled"]:
+                    self.workspace.add_shard(shard)
+                    entry["attached"] = True
+        return shard
+
+    def _build_prompts(self, text: str, context: Optional[Any] = None) -> Dict[str, str]:
+        from util.prompt.get_prompt import PromptService
+        prompt_service = PromptService()
+        inputs = {"pdf_text": text, **self.summary_inputs}
+        return {
+            "short_summary": prompt_service.fetch("overview", "summarizer", "short", inputs, context=context),
+            "detailed_summary": prompt_service.fetch("overview", "summarizer", "detailed", inputs, context=context),
+        }
+
+    def _store(self, entry: Dict[str, Any], stage: str, result: Any) -> None:
+        with self._lock:
+            if entry["cancelled"]:
+                return
+            entry["results"][stage] = result
+            self.stats[stage]["prefetched"] += 1
+
+    def _skip(self, stage: str) -> None:
+        with self._lock:
+            self.stats[stage]["skipped"] += 1
+
+    def _mark_used(self, entry: Dict[str, Any], stage: str) -> None:
+        with self._lock:
+            if stage not in entry["used"]:
+                entry["used"].add(stage)
+                self.stats[stage]["used"] += 1
+
+    def _sync_workspace_use(self, doc_id: str, entry: Dict[str, Any]) -> None:
+        # Caller holds self._lock
+        if entry["attached"] and "index" not in entry["used"] and self.workspace.hits(doc_id) > 0:
+            entry["used"].add("index")
+            self.stats["index"]["used"] += 1
+
+    def get(self, doc_id: str, stage: str) -> Optional[Any]:
+        """
+        Return a prefetched result, or None if it is not ready.
+        Callers should fall back to computing it themselves on None.
+        """
+        assert stage in STAGES, f"Unknown stage: {stage}. Available: {STAGES}"
+        with self._lock:
+            entry = self._docs.get(doc_id)
+            result = entry["results"].get(stage) if entry else None
+            if result is None:
+                self.stats[stage]["missed"] += 1
+                return None
+            if stage not in entry["used"]:
+                entry["used"].add(stage)
+                self.stats[stage]["used"] += 1
+            return result
+
+    def close(self, doc_id: str) -> None:
+        """Document closed: cancel pending prefetch work and drop its results."""
+        with self._lock:
+            entry = self._docs.pop(doc_id, None)
+            if entry is None:
+                return
+            entry["cancelled"] = True
+            self._sync_workspace_use(doc_id, entry)
+            for stage in entry["results"]:
+                if stage not in entry["used"]:
+                    self.stats[stage]["unused_on_close"] += 1
+            if entry["job"] is not None and entry["job"].status in ("queued", "running"):
+                self.stats["cancelled"] += 1
+        entry["context"].cancel("document closed")
+        self.scheduler.cancel_group(doc_id)
+        if entry["attached"]:
+            self.workspace.remove_document(doc_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return prefetch statistics, including the use rate of every stage.
+        """
+        with self._lock:
+            for doc_id, entry in self._docs.items():
+                self._sync_workspace_use(doc_id, entry)
+            stats = {key: dict(value) if isinstance(value, dict) else value for key, value in self.stats.items()}
+        for stage in STAGES:
+            prefetched = stats[stage]["prefetched"]
+            stats[stage]["use_rate"] = stats[stage]["used"] / prefetched if prefetched else None
+        return stats
+
+
+# Example Usage
+if __name__ == "__main__":
+    from util.scheduler.job_scheduler import JobScheduler
+
+    from rag_service import WorkspaceIndex
+
+    scheduler = JobScheduler(max_workers=2)
+    workspace = WorkspaceIndex()
+    prefetch = PrefetchService(scheduler, workspace=workspace)
+
+    pdf_text = "\f".join(
+        f"Report 2024\n\nSection {i} covers topic {i} in detail with several findings.\n\nPage {i}"
+        for i in range(1, 6)
+    )
+    prefetch.open("doc-1", pdf_text=pdf_text)
+    time.sleep(0.5)
+
+    print(workspace.query("topic 3 findings", top_k=1))
+    prompts = prefetch.get("doc-1", "prompts")
+    print(len(prompts["short_summary"]) if prompts else None)
+    print(prefetch.get("doc-1", "summary"))
+    prefetch.close("doc-1")
+    print(prefetch.get_stats())
+    scheduler.shutdown()
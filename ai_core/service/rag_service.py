@@ -0,0 +1,280 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were will with".split()
+)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+# -- Shard --
+class DocumentShard:
+    """
+    BM25 postings for one document.
+    Paragraph ids are blank-line separated paragraphs, in order; pages are split on '\\f'.
+    """
+    __slots__ = ("doc_id", "paragraphs", "pages", "lengths", "postings", "_norm_cache")
+
+    def __init__(self, doc_id: str, pdf_text: str) -> None:
+        self.doc_id = doc_id
+        self.paragraphs: List[str] = []
+        self.pages: List[int] = []
+        for page_number, page in enumerate(pdf_text.split("\f"), start=1):
+            for paragraph in re.split(r"\n\s*\n", page):
+                if paragraph.strip():
+                    self.paragraphs.append(paragraph.strip())
+                    self.pages.append(page_number)
+
+        self.lengths: List[int] = []
+        # term -> [(paragraph index, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        for idx, paragraph in enumerate(self.paragraphs):
+            counts = Counter(_tokenize(paragraph))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((idx, tf))
+        self._norm_cache: Optional[Tuple[float, List[float]]] = None
+
+    def document_frequencies(self) -> Dict[str, int]:
+        return {term: len(posting) for term, posting in self.postings.items()}
+
+    def _norms(self, avgdl: float, k1: float, b: float) -> List[float]:
+        # Length normalisation depends on the workspace average, recomputed only when it changes
+        if self._norm_cache is None or self._norm_cache[0] != avgdl:
+            self._norm_cache = (avgdl, [k1 * (1 - b + b * length / avgdl) for length in self.lengths])
+        return self._norm_cache[1]
+
+    def top_k(
+        self,
+        weighted_terms: List[Tuple[str, float]],
+        k: int,
+        avgdl: float,
+        k1: float,
+        b: float
+    ) -> List[Tuple[float, int]]:
+        """Local top-k as (score, paragraph index)."""
+        norms = self._norms(avgdl, k1, b)
+        scores: Dict[int, float] = {}
+        for term, idf in weighted_terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            weight = idf * (k1 + 1)
+            for idx, tf in posting:
+                scores[idx] = scores.get(idx, 0.0) + weight * tf / (tf + norms[idx])
+        return heapq.nlargest(k, ((score, idx) for idx, score in scores.items()))
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "_norm_cache"}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+        self._norm_cache = None
+
+
+def build_shard(doc_id: str, pdf_text: str) -> DocumentShard:
+    """Module-level helper, picklable for process pools."""
+    return DocumentShard(doc_id, pdf_text)
+
+
+# -- Workspace --
+class WorkspaceIndex:
+    """
+    Retrieval over a stack of related PDFs, sharded by document.
+
+    - Shards are built in parallel in a process pool (`add_documents`)
+    - Workspace-wide BM25 statistics (document frequencies, average length) are kept incrementally,
+      so adding or removing one document never rebuilds the other shards
+    - Queries fan out to every shard, each returns its local top-k, results are merged with a heap
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.5) -> None:
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self.shards: Dict[str, DocumentShard] = {}
+        self._df: Counter = Counter()
+        self._num_paragraphs = 0
+        self._total_length = 0
+        self._hits: Counter = Counter()  # doc_id -> queries that returned one of its paragraphs
+        self._lock = threading.Lock()
+
+    def _attach(self, shard: DocumentShard) -> None:
+        # Caller holds self._lock
+        if shard.doc_id in self.shards:
+            self._detach(shard.doc_id)
+        self.shards[shard.doc_id] = shard
+        self._df.update(shard.document_frequencies())
+        self._num_paragraphs += len(shard.lengths)
+        self._total_length += sum(shard.lengths)
+
+    def _detach(self, doc_id: str) -> Optional[DocumentShard]:
+        # Caller holds self._lock
+        shard = self.shards.pop(doc_id, None)
+        if shard is None:
+            return None
+        self._df.subtract(shard.document_frequencies())
+        self._df += Counter()  # drop terms that reached zero
+        self._num_paragraphs -= len(shard.lengths)
+        self._total_length -= sum(shard.lengths)
+        self._hits.pop(doc_id, None)
+        return shard
+
+    def add_document(self, doc_id: str, pdf_text: str) -> None:
+        """Index (or re-index) one document in-process."""
+        self.add_shard(build_shard(doc_id, pdf_text))
+
+    def add_shard(self, shard: DocumentShard) -> None:
+        """Attach a shard built elsewhere, e.g. by PrefetchService when the document is opened."""
+        with self._lock:
+            self._attach(shard)
+
+    def add_documents(self, documents: Dict[str, str], max_workers: Optional[int] = None) -> None:
+        """Index several documents, building shards in parallel across CPU cores."""
+        if len(documents) <= 1 or max_workers == 1:
+            for doc_id, pdf_text in documents.items():
+                self.add_document(doc_id, pdf_text)
+            return
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            shards = pool.map(build_shard, documents.keys(), documents.values(), chunksize=max(1, len(documents) // 64))
+            for shard in shards:
+                with self._lock:
+                    self._attach(shard)
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Drop one document from the workspace."""
+        with self._lock:
+            return self._detach(doc_id) is not None
+
+    def query(self, text: str, top_k: int = 5, doc_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Search the workspace.
+            :param text: Query text.
+            :param top_k: Number of paragraphs to return across all documents.
+            :param doc_ids: Optional subset of documents to search.
+            :return: [{'doc_id', 'para_id', 'page', 'score', 'text'}], best first.
+        """
+        with self._lock:
+            n = self._num_paragraphs
+            if n == 0:
+                return []
+            avgdl = self._total_length / n or 1.0
+            weighted_terms = []
+            common_terms = []
+            for term in set(_tokenize(text)):
+                df = self._df.get(term, 0)
+                if df == 0:
+                    continue
+                weight = (term, math.log(1 + (n - df + 0.5) / (df + 0.5)))
+                # Terms in most paragraphs add cost but barely change the ranking
+                if n > 20 and df / n > self.max_df_ratio:
+                    common_terms.append(weight)
+                else:
+                    weighted_terms.append(weight)
+            # A query made only of common terms must still match
+            weighted_terms = weighted_terms or common_terms
+            shards = [self.shards[d] for d in doc_ids if d in self.shards] if doc_ids else list(self.shards.values())
+
+        candidates = (
+            (score, shard.doc_id, idx, shard)
+            for shard in shards
+            for score, idx in shard.top_k(weighted_terms, top_k, avgdl, self.k1, self.b)
+        )
+        best = heapq.nlargest(top_k, candidates, key=lambda item: item[0])
+        with self._lock:
+            self._hits.update({doc_id for _, doc_id, _, _ in best})
+        return [
+            {
+                "doc_id": doc_id,
+                "para_id": idx,
+                "page": shard.pages[idx],
+                "score": score,
+                "text": shard.paragraphs[idx],
+            }
+            for score, doc_id, idx, shard in best
+        ]
+
+    def hits(self, doc_id: str) -> int:
+        """Number of queries that returned a paragraph of `doc_id` since it was added."""
+        with self._lock:
+            return self._hits.get(doc_id, 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return statistics about the workspace index.
+        """
+        with self._lock:
+            return {
+                "documents": len(self.shards),
+                "paragraphs": self._num_paragraphs,
+                "terms": len(self._df),
+                "avg_paragraph_length": self._total_length / self._num_paragraphs if self._num_paragraphs else 0.0,
+            }
+
+
+# Benchmark
+# python rag_service.py --docs 100 --pages 100
+if __name__ == "__main__":
+    import argparse
+    import os
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Build and query scaling benchmark for WorkspaceIndex.")
+    parser.add_argument("--docs", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=100, help="Pages per document.")
+    parser.add_argument("--paragraphs", type=int, default=5, help="Paragraphs per page.")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def synthetic_document() -> str:
+        pages = []
+        for _ in range(args.pages):
+            paragraphs = [" ".join(rng.choices(vocabulary, weights, k=60)) for _ in range(args.paragraphs)]
+            pages.append("\n\n".join(paragraphs))
+        return "\f".join(pages)
+
+    documents = {f"doc-{i}": synthetic_document() for i in range(args.docs)}
+    print(f"{args.docs} docs x {args.pages} pages = {args.docs * args.pages} pages")
+
+    cpus = os.cpu_count() or 1
+    workers = sorted({1, cpus} | {2 ** i for i in range(1, 6) if 2 ** i < cpus})
+    for max_workers in workers:
+        index = WorkspaceIndex()
+        start = time.perf_counter()
+        index.add_documents(documents, max_workers=max_workers)
+        print(f"build  workers={max_workers:<3} {time.perf_counter() - start:7.2f}s  {index.get_stats()}")
+
+    queries = [" ".join(rng.choices(vocabulary, weights, k=5)) for _ in range(args.queries)]
+    for num_docs in sorted({max(1, args.docs // 10), max(1, args.docs // 2), args.docs}):
+        subset = [f"doc-{i}" for i in range(num_docs)]
+        latencies = []
+        for q in queries:
+            start = time.perf_counter()
+            index.query(q, top_k=10, doc_ids=subset)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(
+            f"query  docs={num_docs:<5} pages={num_docs * args.pages:<7} "
+            f"p50={latencies[len(latencies) // 2]:6.2f}ms p95={latencies[int(0.95 * (len(latencies) - 1))]:6.2f}ms"
+        )
+
+    # Incremental update: one document in and out, no rebuild
+    start = time.perf_counter()
+    index.remove_document("doc-0")
+    index.add_document("doc-0", documents["doc-0"])
+    print(f"update one document: {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -26,7 +26,7 @@ class OverviewSummarization(SummarizationServiceBase):
     - Short summary 
     - Detailed summary
     """
-    def __init__(self, llm_type: str, llm_api_key: str) -> None: 
+    def __init__(self, llm_type: str, llm_api_key: str, router: Optional[Any] = None) -> None: 
         self.stats = {}
         # init llm
         try:
@@ -35,50 +35,87 @@ class OverviewSummarization(SummarizationServiceBase):
                 llm_type = llm_type,
                 api_key = llm_api_key
             )
+            self.llm_type = llm_type.lower()
+            # Model router, used when `llm_model_name` is None
+            from util.llm.router import get_router
+            self.router = router or get_router(mode="structured")
         except Exception as e:
             raise ValueError(f"Failed to initialize LLM: {e}")
     
     def summarize(
         self, 
-        llm_model_name: str,
+        llm_model_name: Optional[str],
         instructions: str,
         output_model: Any,
         prompt_inputs: dict,
         prompt_config: dict,
         prompt_config_path: Optional[str] = None,
+        latency_slo: Optional[float] = None,
+        compact: bool = False,
+        prompt: Optional[str] = None,
+        context: Optional[Any] = None,
     ) -> dict:
         """
         Summarize the provided inputs using the configured LLM and prompt.
+        Pass `compact=True` to strip headers, footers, page numbers and duplicate paragraphs from `pdf_text` first.
+        Pass a pre-rendered `prompt` (e.g. PrefetchService 'prompts') to skip prompt rendering and compaction.
+        Pass `context` (util.request_context.RequestContext) to abort when the client goes away.
         """
+        from util.request_context import RequestCancelled
         # Validations 
         assert set(prompt_config.keys()) == {'prompt_category', 'prompt_worker', 'prompt_type'}, "Keys do not match expected keys"
         assert 'pdf_text' in prompt_inputs, "pdf_text is required in prompt_inputs"
 
+        compaction_stats = None
+        if compact and prompt is None:
+            from util.text.compaction import DocumentCompactor
+            compactor = DocumentCompactor()
+            prompt_inputs = {**prompt_inputs, 'pdf_text': compactor.compact(prompt_inputs['pdf_text'])}
+            compaction_stats = compactor.get_stats()
+
         response = {}
         # Process -> 
-        try:
-            # Fetch the prompt
-            from util.prompt.get_prompt import PromptService
-            prompt_service = PromptService(config_path=prompt_config_path) if prompt_config_path else PromptService()
-            prompt = prompt_service.fetch(
-                prompt_category = prompt_config.get("prompt_category"),
-                prompt_worker = prompt_config.get("prompt_worker"),
-                prompt_type = prompt_config.get("prompt_type"), 
-                inputs = prompt_inputs
-            )
-            assert prompt, "Prompt cannot be empty. Please check the prompt configuration."
-        except Exception as e:
-            raise ValueError(f"Failed to fetch prompt: {e}")
+        if prompt is None:
+            try:
+                # Fetch the prompt
+                from util.prompt.get_prompt import PromptService
+                prompt_service = PromptService(config_path=prompt_config_path) if prompt_config_path else PromptService()
+                prompt = prompt_service.fetch(
+                    prompt_category = prompt_config.get("prompt_category"),
+                    prompt_worker = prompt_config.get("prompt_worker"),
+                    prompt_type = prompt_config.get("prompt_type"), 
+                    inputs = prompt_inputs,
+                    context = context
+                )
+                assert prompt, "Prompt cannot be empty. Please check the prompt configuration."
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                raise ValueError(f"Failed to fetch prompt: {e}")
         
         try:
             # Generate summary using the LLM
-            response = self.llm.generate(
-                message = prompt,
-                model_name = llm_model_name,
-                output_model = output_model,
-                instructions = instructions
-            )
+            if llm_model_name:
+                response = self.llm.generate(
+                    message = prompt,
+                    model_name = llm_model_name,
+                    output_model = output_model,
+                    instructions = instructions,
+                    context = context
+                )
+            else:
+                response, decision = self.router.generate_with_decision(
+                    llms = {self.llm_type: self.llm},
+                    message = prompt,
+                    instructions = instructions,
+                    output_model = output_model,
+                    latency_slo = latency_slo,
+                    context = context
+                )
+                llm_model_name = decision["model"]
             assert response, "LLM response cannot be empty. Please check the LLM configuration."
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to generate summary: {e}")
         
@@ -88,6 +125,7 @@ class OverviewSummarization(SummarizationServiceBase):
             "output_length": len(response.get('markdown_content', '')),
             "model_name": llm_model_name,
             "words_difference": len(response['markdown_content'].split()) - len(prompt_inputs.get('pdf_text').split()),
+            "compaction": compaction_stats,
         }
         return response
 
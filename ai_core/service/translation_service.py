@@ -1,13 +1,28 @@
 from typing import Any, List, Dict, Optional
 import sys, os 
+import re
+import time
 
 
 class TranslationService: 
+    # Used for translation-memory savings until a latency is observed, ~50 output tokens/second
+    DEFAULT_SECONDS_PER_TOKEN = 0.02
+
     def __init__(
         self,
         llm_type: str,
-        llm_api_key: str
+        llm_api_key: str,
+        translation_memory: Optional[Any] = None,
+        router: Optional[Any] = None
     ) -> None:
+        # Optional util.text.translation_memory.TranslationMemory, enables segment reuse
+        self.translation_memory = translation_memory
+        self.segment_prompt_config = {
+            'prompt_category': 'overview',
+            'prompt_worker': 'translator',
+            'prompt_type': 'segmented'
+        }
+        self._seconds_per_token = 0.0
         # init client 
         try: 
             from util.llm.general import GeneralLLMFactory
@@ -15,28 +30,65 @@ class TranslationService:
                 llm_type=llm_type,
                 api_key=llm_api_key
             )
+            self.llm_type = llm_type.lower()
+            # Model router, used when `llm_model_name` is None
+            from util.llm.router import get_router
+            self.router = router or get_router(mode="general")
         except Exception as e:
             raise ValueError(f"Failed to initialize LLM: {e}")
         
     def translate(
         self,
-        llm_model_name: str, 
+        llm_model_name: Optional[str], 
         instructions: str, 
         prompt_inputs: Dict[str, Any],
         prompt_config: Dict[str, Any] = {
             'prompt_category': 'overview',
             'prompt_worker': 'translator',
             'prompt_type': 'detailed'
-        }
+        },
+        latency_slo: Optional[float] = None,
+        compact: bool = False,
+        context: Optional[Any] = None
     ) -> dict:
         """
         Translate the provided inputs using the configured LLM and prompt.
+        Pass `compact=True` to strip layout artifacts (headers, footers, page numbers) from `pdf_text` first;
+        body paragraphs are always kept.
+        Pass `context` (util.request_context.RequestContext) to abort when the client goes away.
         """ 
         # Validations 
         assert 'pdf_text' in prompt_inputs, "pdf_text is required in prompt_inputs"
 
         response = {}
+        if compact:
+            from util.text.compaction import DocumentCompactor
+            compactor = DocumentCompactor(exact=True)
+            prompt_inputs = {**prompt_inputs, 'pdf_text': compactor.compact(prompt_inputs['pdf_text'])}
+            response['compaction'] = compactor.get_stats()
+        if self.translation_memory is not None:
+            response['translation'] = self._translate_with_memory(
+                llm_model_name, instructions, prompt_inputs, prompt_config, latency_slo, context
+            )
+            response['translation_memory'] = self.translation_memory.get_stats()
+            return response
+
         # Process ->
+        response['translation'] = self._generate(
+            llm_model_name, instructions, prompt_inputs, prompt_config, latency_slo, context
+        )
+        return response
+
+    def _generate(
+        self,
+        llm_model_name: Optional[str],
+        instructions: str,
+        prompt_inputs: Dict[str, Any],
+        prompt_config: Dict[str, Any],
+        latency_slo: Optional[float],
+        context: Optional[Any] = None
+    ) -> str:
+        from util.request_context import RequestCancelled
         try:
             # Fetch the prompt 
             from util.prompt.get_prompt import PromptService
@@ -44,25 +96,151 @@ class TranslationService:
                 prompt_category=prompt_config['prompt_category'],
                 prompt_worker=prompt_config['prompt_worker'],
                 prompt_type=prompt_config['prompt_type'],
-                inputs = prompt_inputs
+                inputs = prompt_inputs,
+                context = context
             )
             assert translation_prompt, "Prompt not found for the given configuration"
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to fetch prompt: {e}")
         
         try: 
             # Generate translation using the LLM
-            generated_text = self.llm.generate(
-                message = translation_prompt,
-                model_name = llm_model_name,
-                instructions = instructions
-            )
+            if llm_model_name:
+                generated_text = self.llm.generate(
+                    message = translation_prompt,
+                    model_name = llm_model_name,
+                    instructions = instructions,
+                    context = context
+                )
+            else:
+                generated_text = self.router.generate(
+                    llms = {self.llm_type: self.llm},
+                    message = translation_prompt,
+                    instructions = instructions,
+                    latency_slo = latency_slo,
+                    context = context
+                )
             assert generated_text, "LLM response cannot be empty. Please check the LLM configuration."
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Failed to generate translation: {e}")
-        
-        response['translation'] = generated_text
-        return response
+        return generated_text
+
+    def _translate_with_memory(
+        self,
+        llm_model_name: Optional[str],
+        instructions: str,
+        prompt_inputs: Dict[str, Any],
+        prompt_config: Dict[str, Any],
+        latency_slo: Optional[float],
+        context: Optional[Any] = None
+    ) -> str:
+        """
+        Translate segment by segment, reusing the translation memory.
+        Exact hits are reused as-is, fuzzy hits are passed as hints, only unmatched segments go to the LLM.
+        If the LLM output cannot be split back into segments, each run of unmatched segments is translated
+        as one block with the regular prompt; exact hits are still reused.
+        """
+        from util.text.translation_memory import split_segments
+        from util.llm.router import estimate_tokens
+
+        memory = self.translation_memory
+        source_language = prompt_inputs.get('source_language', '')
+        target_language = prompt_inputs.get('target_language', '')
+        segments = split_segments(prompt_inputs['pdf_text'])
+
+        results: List[Optional[str]] = [None] * len(segments)
+        pending, hints = [], []
+        num_fuzzy = 0
+        for i, segment in enumerate(segments):
+            # Counted below, once we know the results were used
+            hit = memory.lookup(segment, source_language, target_language, record=False)
+            if hit['match'] == 'exact':
+                results[i] = hit['translation']
+                continue
+            if hit['match'] == 'fuzzy':
+                num_fuzzy += 1
+                hints.append(f"- {hit['source_text']}\n  => {hit['translation']}")
+            pending.append(i)
+
+        num_exact = len(segments) - len(pending)
+        saved_output_tokens = sum(estimate_tokens(segments[i]) for i, r in enumerate(results) if r is not None)
+        if pending:
+            marked = "\n\n".join(f"<<{n}>>\n{segments[i]}" for n, i in enumerate(pending, start=1))
+            start = time.monotonic()
+            generated_text = self._generate(
+                llm_model_name,
+                instructions,
+                {**prompt_inputs, 'pdf_text': marked, 'translation_hints': "\n".join(hints) or "None"},
+                self.segment_prompt_config,
+                latency_slo,
+                context
+            )
+            elapsed = time.monotonic() - start
+
+            parts = re.split(r"<<(\d+)>>", generated_text)
+            translated = {int(num): text.strip() for num, text in zip(parts[1::2], parts[2::2])}
+            if all(translated.get(n) for n in range(1, len(pending) + 1)):
+                for n, i in enumerate(pending, start=1):
+                    results[i] = translated[n]
+                    memory.store(segments[i], translated[n], source_language, target_language)
+                memory.record_lookups(exact_hits=num_exact, fuzzy_hits=num_fuzzy, misses=len(pending) - num_fuzzy)
+                self._seconds_per_token = elapsed / estimate_tokens(generated_text)
+            else:
+                # Hints were never used: those fuzzy lookups are not counted
+                self._translate_runs(
+                    results, segments, pending, llm_model_name, instructions, prompt_inputs,
+                    prompt_config, latency_slo, context
+                )
+                memory.record_lookups(exact_hits=num_exact, misses=len(pending) - num_fuzzy)
+        else:
+            memory.record_lookups(exact_hits=num_exact)
+
+        memory.record_savings(saved_output_tokens * 2, saved_output_tokens * self._estimate_seconds_per_token(llm_model_name))
+        return "\n\n".join(result for result in results if result is not None)
+
+    def _translate_runs(
+        self,
+        results: List[Optional[str]],
+        segments: List[str],
+        pending: List[int],
+        llm_model_name: Optional[str],
+        instructions: str,
+        prompt_inputs: Dict[str, Any],
+        prompt_config: Dict[str, Any],
+        latency_slo: Optional[float],
+        context: Optional[Any]
+    ) -> None:
+        """Fill `results` for runs of consecutive pending segments, one LLM call per run (not stored in memory)."""
+        runs: List[List[int]] = []
+        for i in pending:
+            if runs and runs[-1][-1] == i - 1:
+                runs[-1].append(i)
+            else:
+                runs.append([i])
+        for run in runs:
+            results[run[0]] = self._generate(
+                llm_model_name,
+                instructions,
+                {**prompt_inputs, 'pdf_text': "\n\n".join(segments[i] for i in run)},
+                prompt_config,
+                latency_slo,
+                context
+            ).strip()
+
+    def _estimate_seconds_per_token(self, llm_model_name: Optional[str]) -> float:
+        """Seconds per output token: measured by this service, else observed by the router, else a default."""
+        if self._seconds_per_token:
+            return self._seconds_per_token
+        observed = self.router.get_stats()
+        keys = [f"{self.llm_type}/{llm_model_name}"] if llm_model_name else [
+            key for key in observed if key.startswith(f"{self.llm_type}/")
+        ]
+        rates = [observed[key]["tokens_per_second"] for key in keys if (observed.get(key) or {}).get("tokens_per_second")]
+        return 1.0 / max(rates) if rates else self.DEFAULT_SECONDS_PER_TOKEN
 
 
 
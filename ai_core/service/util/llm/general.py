@@ -1,5 +1,6 @@
 from typing import Any, Optional
 from util.llm.base import LLMBase
+from util.request_context import RequestCancelled, check_context, timeout_kwargs
 
 
 # -- Mode --
@@ -21,14 +22,31 @@ class OpenAIGeneral(GeneralLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_text = ""
         try:
-            response = self.client.responses.create(
-                model = model_name, 
-                instructions = instructions,
-                input = message
-            )
-            response_text = response.output_text
+            check_context(context)
+            if context is None:
+                response = self.client.responses.create(
+                    model = model_name, 
+                    instructions = instructions,
+                    input = message
+                )
+                response_text = response.output_text
+            else:
+                # Stream, so a cancelled request stops generation mid-way
+                stream = self.client.responses.create(
+                    model = model_name,
+                    instructions = instructions,
+                    input = message,
+                    stream = True,
+                    **timeout_kwargs(context)
+                )
+                response_text = context.stream(
+                    stream, lambda event: event.delta if event.type == "response.output_text.delta" else None
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Some error occurred: {str(e)}")
         return response_text
@@ -46,13 +64,25 @@ class GoogleAIGeneral(GeneralLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_text = ""
         try: 
-            response = self.client.models.generate_content(
-                model = model_name,
-                contents = message
-            )
-            response_text = response.text
+            check_context(context)
+            if context is None:
+                response = self.client.models.generate_content(
+                    model = model_name,
+                    contents = message
+                )
+                response_text = response.text
+            else:
+                stream = self.client.models.generate_content_stream(
+                    model = model_name,
+                    contents = message,
+                    config = {"http_options": timeout_kwargs(context, scale=1000)}
+                )
+                response_text = context.stream(stream, lambda chunk: chunk.text)
+        except RequestCancelled:
+            raise
         except Exception as e:
             raise ValueError(f"Some error occurred: {str(e)}")
         return response_text
@@ -70,22 +100,38 @@ class GroqAIGeneral(GeneralLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_text = ""
         try: 
-            response = self.client.chat.completions.create(
-                messages = [
-                    {
-                        "role": "system",
-                        "content": instructions 
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                model = model_name
-            )
-            response_text = response.choices[0].message.content
+            check_context(context)
+            messages = [
+                {
+                    "role": "system",
+                    "content": instructions 
+                },
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ]
+            if context is None:
+                response = self.client.chat.completions.create(
+                    messages = messages,
+                    model = model_name
+                )
+                response_text = response.choices[0].message.content
+            else:
+                stream = self.client.chat.completions.create(
+                    messages = messages,
+                    model = model_name,
+                    stream = True,
+                    **timeout_kwargs(context)
+                )
+                response_text = context.stream(
+                    stream, lambda chunk: chunk.choices[0].delta.content if chunk.choices else None
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_text = f"Some error occurred: {str(e)}"
         return response_text
@@ -103,22 +149,37 @@ class MistralAIGeneral(GeneralLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_text = ""
         try: 
-            response = self.client.chat.complete(
-                model = model_name,
-                messages = [
-                    {
-                        "role": "system",
-                        "content": instructions
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ]
-            )
-            response_text = response.choices[0].message.content
+            check_context(context)
+            messages = [
+                {
+                    "role": "system",
+                    "content": instructions
+                },
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ]
+            if context is None:
+                response = self.client.chat.complete(
+                    model = model_name,
+                    messages = messages
+                )
+                response_text = response.choices[0].message.content
+            else:
+                stream = self.client.chat.stream(
+                    model = model_name,
+                    messages = messages,
+                    **timeout_kwargs(context, key="timeout_ms", scale=1000)
+                )
+                response_text = context.stream(
+                    stream, lambda event: event.data.choices[0].delta.content if event.data.choices else None
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_text = f"Some error occurred: {str(e)}"
         return response_text
@@ -136,25 +197,74 @@ class AnthropicAIGeneral(GeneralLLMBase):
         return models
 
     def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_text = ""
         try: 
-            response = self.client.messages.create(
-                model = model_name,
-                temperature = 0.7,
-                system = instructions,
-                messages = [
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ]
-            )
-            response_text = response.content[0].text
+            check_context(context)
+            messages = [
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ]
+            if context is None:
+                response = self.client.messages.create(
+                    model = model_name,
+                    temperature = 0.7,
+                    system = instructions,
+                    messages = messages
+                )
+                response_text = response.content[0].text
+            else:
+                stream = self.client.messages.create(
+                    model = model_name,
+                    temperature = 0.7,
+                    system = instructions,
+                    messages = messages,
+                    stream = True,
+                    **timeout_kwargs(context)
+                )
+                response_text = context.stream(
+                    stream,
+                    lambda event: event.delta.text
+                    if event.type == "content_block_delta" and event.delta.type == "text_delta" else None
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_text = f"Some error occurred: {str(e)}"
         return response_text
 
 
+class MockGeneral(GeneralLLMBase):
+    """Local provider for tests, demos and bulk dry runs. No network calls, no tokens spent."""
+    def __init__(self, api_key: str) -> Any:
+        super().__init__(api_key)
+        mock_config = (self.config.get("llm_general") or {}).get("mock") or {}
+        self.latency_seconds = float(mock_config.get("latency_seconds", 0.0))
+
+    def list_models(self) -> list:
+        models = self.config.get("llm_general").get("mock").get("models")
+        return models
+
+    def generate(self, message: str, model_name: str, instructions: str, **kwargs) -> Any:
+        import time
+        context = kwargs.get("context")
+        check_context(context)
+        words = message.split()
+        if context is None:
+            time.sleep(self.latency_seconds)
+            return f"[{model_name}] " + " ".join(words[-40:])
+
+        def events():
+            # One word per event, spread over `latency_seconds`
+            tail = [f"[{model_name}]"] + words[-40:]
+            for word in tail:
+                time.sleep(self.latency_seconds / len(tail))
+                yield word + " "
+        return context.stream(events(), lambda word: word).rstrip()
+
+
 # -- Factory Class --
 class GeneralLLMFactory:
     @classmethod
@@ -178,7 +288,8 @@ class GeneralLLMFactory:
             "google": GoogleAIGeneral,
             "groq": GroqAIGeneral,
             "mistral": MistralAIGeneral,
-            "anthropic": AnthropicAIGeneral
+            "anthropic": AnthropicAIGeneral,
+            "mock": MockGeneral
         }
         
         llm_class = llm_classes.get(llm_type.lower())
@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import yaml
+
+from util.request_context import RequestCancelled, RequestContext, check_context
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _is_failed_response(response: Any) -> bool:
+    # Some providers return an error string or an empty dict instead of raising
+    if not response:
+        return True
+    return isinstance(response, str) and response.startswith("Some error occurred")
+
+
+# -- Rolling stats --
+class ModelStats:
+    """Observed latency, throughput and error rate of one provider/model over a rolling window."""
+    def __init__(self, window_seconds: float) -> None:
+        self.window_seconds = window_seconds
+        # (timestamp, latency_seconds, output_tokens, failed)
+        self.samples: Deque[Tuple[float, float, int, bool]] = deque()
+
+    def add(self, latency: float, output_tokens: int, failed: bool) -> None:
+        self.samples.append((time.monotonic(), latency, output_tokens, failed))
+        self._expire()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+
+    def summary(self) -> Dict[str, Any]:
+        self._expire()
+        samples = list(self.samples)
+        if not samples:
+            return {"count": 0, "p50_latency": None, "p95_latency": None, "tokens_per_second": None, "error_rate": 0.0}
+        ok = sorted(s[1] for s in samples if not s[3])
+        busy = sum(s[1] for s in samples if not s[3])
+        return {
+            "count": len(samples),
+            "p50_latency": ok[len(ok) // 2] if ok else None,
+            "p95_latency": ok[int(0.95 * (len(ok) - 1))] if ok else None,
+            "tokens_per_second": sum(s[2] for s in samples if not s[3]) / busy if busy else None,
+            "error_rate": sum(1 for s in samples if s[3]) / len(samples),
+        }
+
+
+# -- Router --
+class LLMRouter:
+    """
+    Picks a provider/model per request from llm_config.yaml, so callers need not hard-code `llm_model_name`.
+
+    - Candidates: models listed for the mode (`llm_general` / `llm_structured`) of the given providers
+    - Filters out models whose context is too small or whose rolling error rate is too high
+    - Prefers models whose observed p95 latency meets the SLO, then the cheapest, then the fastest
+    - `generate` falls back to the next candidate when a call fails
+    """
+    def __init__(self, mode: str = "general", config_path: Optional[str] = None, max_decisions: int = 200) -> None:
+        assert mode in ("general", "structured"), "mode must be 'general' or 'structured'"
+        self.mode = mode
+        config_path = config_path or os.path.join(os.path.dirname(__file__), 'llm_config.yaml')
+        try:
+            with open(config_path, 'r') as file:
+                config = yaml.safe_load(file)
+        except Exception as e:
+            print(f"Config file error: {e}. Using empty configuration.")
+            config = {}
+        self.models_config = config.get(f"llm_{mode}") or {}
+        routing = config.get("llm_routing") or {}
+        self.routing_config = routing.get("models") or {}
+        self.default_latency_slo = routing.get("default_latency_slo", 10.0)
+        self.window_seconds = routing.get("window_seconds", 300)
+        self.max_error_rate = routing.get("max_error_rate", 0.3)
+
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._lock = threading.Lock()
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=max_decisions)
+
+    def _model_stats(self, provider: str, model: str) -> ModelStats:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._stats:
+                self._stats[key] = ModelStats(self.window_seconds)
+            return self._stats[key]
+
+    def record(self, provider: str, model: str, latency: float, output_tokens: int = 0, failed: bool = False) -> None:
+        """Record the outcome of one call."""
+        self._model_stats(provider, model).add(latency, output_tokens, failed)
+
+    def candidates(
+        self,
+        providers: List[str],
+        input_tokens: int,
+        latency_slo: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank every eligible provider/model for a request, best first.
+            :param providers: Providers the caller has clients for.
+            :param input_tokens: Estimated prompt size.
+            :param latency_slo: Latency target in seconds; defaults to `default_latency_slo`.
+        """
+        latency_slo = latency_slo or self.default_latency_slo
+        ranked = []
+        for provider in providers:
+            provider_config = self.models_config.get(provider) or {}
+            default_model = provider_config.get("default_model")
+            for model in provider_config.get("models") or []:
+                meta = (self.routing_config.get(provider) or {}).get(model) or {}
+                context_tokens = meta.get("context_tokens", 32000)
+                if input_tokens > context_tokens:
+                    continue
+                summary = self._model_stats(provider, model).summary()
+                healthy = summary["count"] < 3 or summary["error_rate"] <= self.max_error_rate
+                # Unobserved models are assumed to meet the SLO until measured
+                expected = summary["p95_latency"]
+                meets_slo = expected is None or expected <= latency_slo
+                ranked.append({
+                    "provider": provider,
+                    "model": model,
+                    "cost_rank": meta.get("cost_rank", 3),
+                    "context_tokens": context_tokens,
+                    "healthy": healthy,
+                    "meets_slo": meets_slo,
+                    "stats": summary,
+                    "_key": (
+                        not healthy,
+                        not meets_slo,
+                        meta.get("cost_rank", 3),
+                        expected if expected is not None else latency_slo,
+                        model != default_model,
+                    ),
+                })
+        ranked.sort(key=lambda c: c["_key"])
+        for candidate in ranked:
+            candidate.pop("_key")
+        return ranked
+
+    def route(
+        self,
+        providers: List[str],
+        input_tokens: int,
+        latency_slo: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Return the routing decision for one request; the decision is also kept in `decisions`."""
+        ranked = self.candidates(providers, input_tokens, latency_slo)
+        if not ranked:
+            raise ValueError(f"No {self.mode} model fits {input_tokens} input tokens for providers: {providers}")
+        decision = {
+            "timestamp": time.time(),
+            "mode": self.mode,
+            "input_tokens": input_tokens,
+            "latency_slo": latency_slo or self.default_latency_slo,
+            "provider": ranked[0]["provider"],
+            "model": ranked[0]["model"],
+            "reason": self._reason(ranked[0]),
+            "fallbacks": [(c["provider"], c["model"]) for c in ranked[1:4]],
+            "attempts": [],
+        }
+        self.decisions.append(decision)
+        return decision
+
+    @staticmethod
+    def _reason(candidate: Dict[str, Any]) -> str:
+        if not candidate["healthy"]:
+            return "no healthy model left, using least degraded"
+        if not candidate["meets_slo"]:
+            return "no model meets latency SLO, using fastest cheapest"
+        return "cheapest model meeting latency SLO"
+
+    def generate(
+        self,
+        llms: Dict[str, Any],
+        message: str,
+        instructions: str,
+        output_model: Any = None,
+        latency_slo: Optional[float] = None,
+        max_attempts: int = 3,
+        context: Optional[RequestContext] = None,
+        **kwargs
+    ) -> Any:
+        """
+        Route and run one call, falling back to the next candidate on failure.
+            :param llms: {provider: llm instance} from GeneralLLMFactory / StructuredLLMFactory.
+            :param output_model: Required in structured mode.
+            :param context: Optional request context; no fallback attempt is made once it is cancelled.
+        """
+        return self.generate_with_decision(
+            llms, message, instructions, output_model, latency_slo, max_attempts, context, **kwargs
+        )[0]
+
+    def generate_with_decision(
+        self,
+        llms: Dict[str, Any],
+        message: str,
+        instructions: str,
+        output_model: Any = None,
+        latency_slo: Optional[float] = None,
+        max_attempts: int = 3,
+        context: Optional[RequestContext] = None,
+        **kwargs
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        `generate`, also returning this call's routing decision.
+        Use it instead of `get_decisions`, which may hold other concurrent requests' decisions.
+        """
+        if self.mode == "structured":
+            assert output_model is not None, "output_model is required in structured mode"
+        input_tokens = estimate_tokens(message) + estimate_tokens(instructions)
+        remaining = context.remaining() if context is not None else None
+        if remaining is not None:
+            # Route for what is left of the request deadline
+            latency_slo = min(latency_slo or self.default_latency_slo, remaining)
+        decision = self.route(list(llms), input_tokens, latency_slo)
+        targets = [(decision["provider"], decision["model"])] + decision["fallbacks"]
+
+        last_error = None
+        for provider, model in targets[:max_attempts]:
+            check_context(context)
+            llm = llms[provider]
+            params = dict(message=message, model_name=model, instructions=instructions, **kwargs)
+            if self.mode == "structured":
+                params["output_model"] = output_model
+            if context is not None:
+                params["context"] = context
+            start = time.monotonic()
+            try:
+                response = llm.generate(**params)
+                failed = _is_failed_response(response)
+                if failed:
+                    last_error = response or "Empty response"
+            except RequestCancelled:
+                # Cancellation says nothing about model health
+                decision["attempts"].append({"provider": provider, "model": model, "cancelled": True})
+                raise
+            except Exception as e:
+                response, failed, last_error = None, True, e
+            latency = time.monotonic() - start
+            output_tokens = estimate_tokens(str(response)) if not failed else 0
+            self.record(provider, model, latency, output_tokens, failed)
+            decision["attempts"].append({"provider": provider, "model": model, "latency": latency, "failed": failed})
+            if not failed:
+                decision["provider"], decision["model"] = provider, model
+                return response, decision
+        raise ValueError(f"All routed models failed. Last error: {last_error}")
+
+    def get_decisions(self, last: int = 20) -> List[Dict[str, Any]]:
+        """Return the most recent routing decisions, for debugging."""
+        return list(self.decisions)[-last:]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return rolling stats per provider/model.
+        """
+        with self._lock:
+            keys = list(self._stats)
+        return {f"{provider}/{model}": self._model_stats(provider, model).summary() for provider, model in keys}
+
+
+# -- Shared routers --
+_shared_routers: Dict[str, LLMRouter] = {}
+_shared_lock = threading.Lock()
+
+
+def get_router(mode: str = "general") -> LLMRouter:
+    """
+    Process-wide router per mode, so latency / error observations are shared across services and requests.
+    Services use it unless they are given a router: calling a service with `llm_model_name=None` lets this
+    router pick the model, within `latency_slo` seconds when one is given.
+    """
+    with _shared_lock:
+        if mode not in _shared_routers:
+            _shared_routers[mode] = LLMRouter(mode=mode)
+        return _shared_routers[mode]
+
+
+# Example usage:
+if __name__ == "__main__":
+    router = LLMRouter(mode="general")
+    print(router.route(providers=["openai", "google"], input_tokens=2000))
+
+    # gpt-4.1-nano degrades -> router moves away from it
+    for _ in range(5):
+        router.record("openai", "gpt-4.1-nano", latency=30.0, failed=True)
+    print(router.route(providers=["openai"], input_tokens=2000)["model"])
+    # Large inputs skip small-context models
+    print(router.route(providers=["openai"], input_tokens=500000)["model"])
+    print(router.get_stats())
@@ -1,11 +1,19 @@
-from typing import Any, Optional
+import json
+from typing import Any, Callable, Iterable, Optional
 from util.llm.base import LLMBase
+from util.request_context import RequestCancelled, check_context, timeout_kwargs
 
 
 # -- Mode --
 class StructuredLLMBase(LLMBase):
     def _get_mode(self) -> str:
         return "structured"
+
+    @staticmethod
+    def _parse_stream(context: Any, events: Iterable[Any], extract: Callable[[Any], Optional[str]], output_model: Any) -> dict:
+        """Consume a streamed JSON response under `context` (aborted on cancel) and validate it."""
+        text = context.stream(events, extract)
+        return output_model.model_validate_json(text).model_dump()
     
 
 # -- LLM Classes --
@@ -21,16 +29,36 @@ class OpenAIStructured(StructuredLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, output_model: Any, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_cls = None
         try:
-            response = self.client.responses.parse(
-                model = model_name,
-                instructions = instructions,
-                input = message,
-                text_format = output_model
-            )
-            event = response.output_parsed 
-            response_cls = event.model_dump()
+            check_context(context)
+            if context is None:
+                response = self.client.responses.parse(
+                    model = model_name,
+                    instructions = instructions,
+                    input = message,
+                    text_format = output_model
+                )
+                event = response.output_parsed 
+                response_cls = event.model_dump()
+            else:
+                # Stream, so a cancelled request stops generation mid-way
+                with self.client.responses.stream(
+                    model = model_name,
+                    instructions = instructions,
+                    input = message,
+                    text_format = output_model,
+                    **timeout_kwargs(context)
+                ) as stream:
+                    response_cls = self._parse_stream(
+                        context,
+                        stream,
+                        lambda event: event.delta if event.type == "response.output_text.delta" else None,
+                        output_model
+                    )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_cls = {}
         return response_cls
@@ -48,18 +76,31 @@ class GoogleAIStructured(StructuredLLMBase):
         return models
 
     def generate(self, message: str, model_name: str, output_model: Any, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_cls = None
         try:
-            response = self.client.models.generate_content(
-                model = model_name, 
-                contents = message, 
-                config = {
-                    "response_mime_type": "application/json",
-                    "response_schema": output_model
-                }
-            )
-            event = response.parsed 
-            response_cls = event[0].model_dump()
+            check_context(context)
+            config = {
+                "response_mime_type": "application/json",
+                "response_schema": output_model
+            }
+            if context is None:
+                response = self.client.models.generate_content(
+                    model = model_name, 
+                    contents = message, 
+                    config = config
+                )
+                event = response.parsed 
+                response_cls = event[0].model_dump()
+            else:
+                stream = self.client.models.generate_content_stream(
+                    model = model_name,
+                    contents = message,
+                    config = {**config, "http_options": timeout_kwargs(context, scale=1000)}
+                )
+                response_cls = self._parse_stream(context, stream, lambda chunk: chunk.text, output_model)
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_cls = {}
         return response_cls
@@ -77,26 +118,46 @@ class GroqAIStructured(StructuredLLMBase):
         return models
 
     def generate(self, message: str, model_name: str, output_model: Any, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_cls = None
         try:
-            response = self.client.chat.completions.create(
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "{instructions}\n".format(instructions=instructions) +
-                        f" The JSON object must use the schema: {json.dumps(output_model.model_json_schema(), indent=2)}"
-                    },
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
-                model = model_name,
-                temperature = 0,
-                stream = False
-            )
-            event = output_model.model_validate_json(response.choices[0].message.content)
-            response_cls = event.model_dump()
+            check_context(context)
+            messages = [
+                {
+                    "role": "system",
+                    "content": "{instructions}\n".format(instructions=instructions) +
+                    f" The JSON object must use the schema: {json.dumps(output_model.model_json_schema(), indent=2)}"
+                },
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ]
+            if context is None:
+                response = self.client.chat.completions.create(
+                    messages = messages,
+                    model = model_name,
+                    temperature = 0,
+                    stream = False
+                )
+                event = output_model.model_validate_json(response.choices[0].message.content)
+                response_cls = event.model_dump()
+            else:
+                stream = self.client.chat.completions.create(
+                    messages = messages,
+                    model = model_name,
+                    temperature = 0,
+                    stream = True,
+                    **timeout_kwargs(context)
+                )
+                response_cls = self._parse_stream(
+                    context,
+                    stream,
+                    lambda chunk: chunk.choices[0].delta.content if chunk.choices else None,
+                    output_model
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_cls = {}
         return response_cls
@@ -114,31 +175,86 @@ class MistralAIStructured(StructuredLLMBase):
         return models
     
     def generate(self, message: str, model_name: str, output_model: Any, instructions: str, **kwargs) -> Any:
+        context = kwargs.get("context")
         response_cls = None
         try:
-            response = self.client.chat.parse(
-                model = model_name,
-                messages = [
-                    {
-                        "role": "system",
-                        "content": instructions
-                    }, 
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ], 
-                response_format = output_model,
-                max_tokens = 3000, 
-                temperature = 0
-            )
-            event = response.choices[0].message.content
-            response_cls = event 
+            check_context(context)
+            messages = [
+                {
+                    "role": "system",
+                    "content": instructions
+                }, 
+                {
+                    "role": "user",
+                    "content": message
+                }
+            ]
+            if context is None:
+                response = self.client.chat.parse(
+                    model = model_name,
+                    messages = messages, 
+                    response_format = output_model,
+                    max_tokens = 3000, 
+                    temperature = 0
+                )
+                event = response.choices[0].message.content
+                response_cls = event 
+            else:
+                stream = self.client.chat.parse_stream(
+                    model = model_name,
+                    messages = messages,
+                    response_format = output_model,
+                    max_tokens = 3000,
+                    temperature = 0,
+                    **timeout_kwargs(context, key="timeout_ms", scale=1000)
+                )
+                response_cls = self._parse_stream(
+                    context,
+                    stream,
+                    lambda event: event.data.choices[0].delta.content if event.data.choices else None,
+                    output_model
+                )
+        except RequestCancelled:
+            raise
         except Exception as e:
             response_cls = {}
         return response_cls 
     
 
+class MockStructured(StructuredLLMBase):
+    """Local provider for tests, demos and bulk dry runs. Fills every field of `output_model` with placeholder text."""
+    def __init__(self, api_key: str) -> None:
+        super().__init__(api_key)
+        mock_config = (self.config.get("llm_structured") or {}).get("mock") or {}
+        self.latency_seconds = float(mock_config.get("latency_seconds", 0.0))
+
+    def list_models(self) -> list:
+        models = self.config.get("llm_structured").get("mock").get("models")
+        return models
+
+    def generate(self, message: str, model_name: str, output_model: Any, instructions: str, **kwargs) -> Any:
+        import time
+        from typing import get_origin
+        context = kwargs.get("context")
+        check_context(context)
+        text = f"[{model_name}] " + " ".join(message.split()[-40:])
+        response_cls = {}
+        for name, field in output_model.model_fields.items():
+            response_cls[name] = [text] if get_origin(field.annotation) is list else text
+        if context is None:
+            time.sleep(self.latency_seconds)
+            return response_cls
+
+        def events():
+            # The JSON response in 20 pieces, spread over `latency_seconds`
+            payload = json.dumps(response_cls)
+            step = max(1, len(payload) // 20)
+            for i in range(0, len(payload), step):
+                time.sleep(self.latency_seconds * step / len(payload))
+                yield payload[i:i + step]
+        return json.loads(context.stream(events(), lambda piece: piece))
+
+
 # -- Factory Class -- 
 class StructuredLLMFactory:
     @classmethod
@@ -162,7 +278,8 @@ class StructuredLLMFactory:
             "openai": OpenAIStructured,
             "google": GoogleAIStructured,
             "groq": GroqAIStructured,
-            "mistral": MistralAIStructured
+            "mistral": MistralAIStructured,
+            "mock": MockStructured
         }
         return llm_classes.get(llm_type.lower())(api_key) if llm_type.lower() in llm_classes else None
     
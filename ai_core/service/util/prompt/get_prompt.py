@@ -28,13 +28,16 @@ class PromptService:
         """Get the list of inputs required for a specific prompt file."""
         return self.config.get('prompt_inputs').get(file_path, [])
 
-    def fetch(self, prompt_category: str, prompt_worker: str, prompt_type: str, inputs: dict) -> str:
+    def fetch(self, prompt_category: str, prompt_worker: str, prompt_type: str, inputs: dict, context: Optional[Any] = None) -> str:
         """
         Fetch a specific prompt based on category, worker, and type.
 
         # NOTE: To use this function appropriately, take reference from the prompt_config.yaml file to understand the structure of prompts.
         # The prompt_category, prompt_worker, and prompt_type should match the keys in the configuration file.
+        # Pass `context` (util.request_context.RequestContext) to stop early on cancelled requests.
         """
+        if context is not None:
+            context.check()
         if not self.config:
             raise ValueError("Configuration not loaded. Please check the config file path.")
         
@@ -0,0 +1,203 @@
+import inspect
+import math
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class RequestCancelled(Exception):
+    """Raised when a request was cancelled by the client or ran past its deadline."""
+
+
+class DeadlineExceeded(RequestCancelled):
+    """Raised when a request ran past its deadline."""
+
+
+# -- Stream pump --
+class _StreamPump:
+    """
+    Iterates a provider generator in a daemon thread.
+    A generator cannot be closed from another thread while it is blocked in a read, so `close()` releases
+    the consumer instead; the pump thread closes the generator itself once the read returns or times out.
+    """
+    _END = object()
+
+    def __init__(self, generator: Iterator[Any]) -> None:
+        self._generator = generator
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = threading.Event()
+        threading.Thread(target=self._run, name="stream-pump", daemon=True).start()
+
+    def _run(self) -> None:
+        try:
+            for event in self._generator:
+                if self._closed.is_set():
+                    break
+                self._queue.put((event, None))
+        except Exception as e:
+            self._queue.put((None, e))
+        finally:
+            self._generator.close()
+            self._queue.put((self._END, None))
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            event, error = self._queue.get()
+            if error is not None:
+                raise error
+            if event is self._END or self._closed.is_set():
+                return
+            yield event
+
+    def close(self) -> None:
+        self._closed.set()
+        self._queue.put((self._END, None))
+
+
+# -- Request context --
+class RequestContext:
+    """
+    Deadline + cancellation token carried through one frontend request.
+    # NOTE: Pass it as `context=` to PromptService.fetch, the LLM `generate` methods, LLMRouter.generate,
+    # JobScheduler.submit / submit_chunks and the services; each checks it before doing more work.
+
+    - `cancel()` when the client disconnects (e.g. the user closes the tab mid-summary)
+    - `deadline_seconds` bounds the whole request, provider calls get the remaining time as timeout
+    - `get_stats()` reports the work that was skipped or aborted
+    """
+    def __init__(self, deadline_seconds: Optional[float] = None) -> None:
+        self.created_at = time.monotonic()
+        self.deadline = self.created_at + deadline_seconds if deadline_seconds is not None else None
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        self.stats = {
+            "skipped_calls": 0,
+            "aborted_streams": 0,
+            "dropped_chunks": 0,
+            "streamed_chars_before_abort": 0,
+        }
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancelled.is_set() and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline exceeded")
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, None if there is no deadline."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def cancel(self, reason: str = "client disconnected") -> None:
+        """Cancel the request; registered callbacks (e.g. scheduler job cancellation) run once."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancel callback error: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Run `callback` when the request is cancelled (immediately if it already is).
+        Returns a function that deregisters it; call it once the guarded work is done.
+        """
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def check(self) -> None:
+        """Raise if the request is cancelled or past its deadline; counts the call as skipped."""
+        if self.cancelled:
+            self.record("skipped_calls")
+            self._raise()
+
+    def _raise(self) -> None:
+        if self.reason == "deadline exceeded":
+            raise DeadlineExceeded("Request deadline exceeded")
+        raise RequestCancelled(f"Request cancelled: {self.reason}")
+
+    def record(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def stream(self, events: Iterable[Any], extract: Callable[[Any], Optional[str]]) -> str:
+        """
+        Consume a provider stream, aborting it as soon as the request is cancelled.
+            :param events: Stream returned by the provider SDK.
+            :param extract: Returns the text delta of one event, or None.
+        """
+        # Closing the stream drops the HTTP connection, which stops generation provider-side.
+        # Closing from the cancelling thread also unblocks a read waiting on a stalled provider.
+        # Generators (e.g. google-genai streams) cannot be closed mid-read from another thread, so they are pumped.
+        if inspect.isgenerator(events):
+            events = _StreamPump(events)
+        close = getattr(events, "close", None)
+        remove_callback = self.on_cancel(close) if callable(close) else None
+        parts = []
+        try:
+            for event in events:
+                if self.cancelled:
+                    break
+                delta = extract(event)
+                if delta:
+                    parts.append(delta)
+        except Exception:
+            if not self.cancelled:
+                raise
+        finally:
+            if remove_callback is not None:
+                remove_callback()
+                close()
+        if self.cancelled:
+            self.record("aborted_streams")
+            self.record("streamed_chars_before_abort", sum(len(p) for p in parts))
+            self._raise()
+        return "".join(parts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return the work skipped or aborted because of cancellation.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats["cancelled"] = self._cancelled.is_set()
+        stats["reason"] = self.reason
+        stats["elapsed_seconds"] = time.monotonic() - self.created_at
+        return stats
+
+
+def check_context(context: Optional[RequestContext]) -> None:
+    """`context.check()` that accepts None, for optional context parameters."""
+    if context is not None:
+        context.check()
+
+
+def timeout_kwargs(context: Optional[RequestContext], key: str = "timeout", scale: float = 1.0) -> Dict[str, float]:
+    """
+    Per-call timeout keyword for provider SDKs, from the remaining deadline ({} if there is none).
+    Scaled timeouts (e.g. milliseconds) are rounded up to whole numbers, as those SDKs expect ints.
+    """
+    remaining = context.remaining() if context is not None else None
+    if remaining is None:
+        return {}
+    return {key: remaining if scale == 1.0 else max(1, math.ceil(remaining * scale))}
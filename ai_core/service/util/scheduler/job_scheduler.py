@@ -0,0 +1,382 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from util.request_context import RequestCancelled, RequestContext
+
+
+# -- Priority classes --
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BULK = "bulk"
+
+DEFAULT_WEIGHTS = {
+    BACKGROUND: 4,
+    BULK: 1,
+}
+
+
+class JobCancelledError(Exception):
+    """Raised when waiting on a job that was cancelled."""
+
+
+# -- Job --
+class Job:
+    """
+    A unit of work submitted to the scheduler.
+    Bulk work is submitted as several chunks, so queued chunks can be overtaken or dropped.
+    """
+    def __init__(
+        self,
+        job_id: int,
+        priority: str,
+        chunks: List[Tuple[Callable, tuple, dict]],
+        group: Optional[Hashable] = None,
+        on_progress: Optional[Callable[["Job"], None]] = None,
+        context: Optional[RequestContext] = None
+    ) -> None:
+        self.job_id = job_id
+        self.priority = priority
+        self.group = group
+        self.context = context
+        self.total = len(chunks)
+        self.done = 0
+        self.status = "queued"
+        self.results: List[Any] = [None] * len(chunks)
+        self.error: Optional[BaseException] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._chunks = chunks
+        self._on_progress = on_progress
+        self._finished = threading.Event()
+        self._release: Optional[Callable[[], None]] = None  # Deregisters the context cancel callback
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.status == "cancelled"
+
+    def cancel(self) -> bool:
+        """Cancel the job. Queued chunks are dropped; a running chunk finishes but its result is discarded."""
+        with self._lock:
+            if self._finished.is_set():
+                return False
+            self.status = "cancelled"
+            self.finished_at = time.monotonic()
+            self._finish()
+        return True
+
+    def progress(self) -> Dict[str, Any]:
+        """Return progress of the job."""
+        return {
+            "job_id": self.job_id,
+            "priority": self.priority,
+            "group": self.group,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "fraction": self.done / self.total if self.total else 1.0,
+        }
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the job and return its result.
+        Single-chunk jobs return the chunk result, chunked jobs return a list in chunk order.
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError(f"Job {self.job_id} did not finish within {timeout}s")
+        if self.cancelled:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+        if self.error is not None:
+            raise self.error
+        return self.results[0] if self.total == 1 else list(self.results)
+
+    def _finish(self) -> None:
+        self._finished.set()
+        if self._release is not None:
+            self._release()
+
+    def _run_chunk(self, index: int) -> None:
+        if self._finished.is_set():
+            return
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+                self.status = "running"
+        fn, args, kwargs = self._chunks[index]
+        try:
+            value = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                if not self._finished.is_set():
+                    self.error = e
+                    self.status = "cancelled" if isinstance(e, RequestCancelled) else "failed"
+                    self.finished_at = time.monotonic()
+                    self._finish()
+            return
+        with self._lock:
+            if self._finished.is_set():
+                return
+            self.results[index] = value
+            self.done += 1
+            if self.done == self.total:
+                self.status = "completed"
+                self.finished_at = time.monotonic()
+                self._finish()
+        if self._on_progress:
+            try:
+                self._on_progress(self)
+            except Exception as e:
+                print(f"Progress callback error: {e}")
+
+
+# -- Scheduler --
+class JobScheduler:
+    """
+    Priority scheduler in front of the LLM factories.
+
+    - `interactive` jobs always run before any queued chunk of other classes
+    - `background` and `bulk` share the remaining capacity by weighted fair queueing
+    - `reserved_interactive` workers only take interactive jobs, so a right-click
+      "Explain this" never waits behind a running bulk chunk
+    """
+    def __init__(
+        self,
+        max_workers: int = 4,
+        reserved_interactive: int = 1,
+        weights: Optional[Dict[str, int]] = None
+    ) -> None:
+        assert max_workers > reserved_interactive >= 0, "max_workers must exceed reserved_interactive"
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._queues: Dict[str, Deque[Tuple[Job, int]]] = {
+            INTERACTIVE: deque(),
+            **{name: deque() for name in self.weights},
+        }
+        # Virtual finish time per class for weighted fair queueing
+        self._virtual: Dict[str, float] = {name: 0.0 for name in self.weights}
+        # Finish tag of the last dispatched chunk (system virtual time)
+        self._last_virtual = 0.0
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "dropped_chunks": 0,
+            "wait_seconds": {name: deque(maxlen=1000) for name in self._queues},
+        }
+        self._workers = [
+            threading.Thread(
+                target=self._worker,
+                args=(i < reserved_interactive,),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        priority: str = INTERACTIVE,
+        group: Optional[Hashable] = None,
+        on_progress: Optional[Callable[[Job], None]] = None,
+        context: Optional[RequestContext] = None,
+        **kwargs
+    ) -> Job:
+        """
+        Submit a single call, e.g. one `llm.generate(...)`.
+        `context` is used for cancellation and also forwarded to `fn` as `context=`.
+        """
+        if context is not None:
+            kwargs["context"] = context
+        return self.submit_chunks(
+            [(fn, args, kwargs)], priority=priority, group=group, on_progress=on_progress, context=context
+        )
+
+    def submit_chunks(
+        self,
+        chunks: List[Tuple[Callable, tuple, dict]],
+        priority: str = BULK,
+        group: Optional[Hashable] = None,
+        on_progress: Optional[Callable[[Job], None]] = None,
+        context: Optional[RequestContext] = None
+    ) -> Job:
+        """
+        Submit a chunked job, e.g. the pages of a 300-page translation.
+            :param chunks: List of (fn, args, kwargs); each chunk is scheduled independently.
+            :param priority: One of 'interactive', 'background', 'bulk'.
+            :param group: Optional key (e.g. document id) used by `cancel_group`.
+            :param context: Optional request context; cancelling it cancels the job and drops its queued chunks.
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}. Available: {list(self._queues)}")
+        assert chunks, "At least one chunk is required"
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler is shut down")
+            job = Job(next(self._ids), priority, chunks, group=group, on_progress=on_progress, context=context)
+            self._jobs[job.job_id] = job
+            queue = self._queues[priority]
+            if not queue and priority in self.weights:
+                self._activate(priority)
+            for index in range(len(chunks)):
+                queue.append((job, index))
+            self.stats["submitted"] += 1
+            self._cond.notify_all()
+        if context is not None:
+            job._release = context.on_cancel(lambda: self._cancel_jobs([job]))
+            if job._finished.is_set():
+                # Finished before the callback was registered
+                job._release()
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job by id."""
+        job = self._jobs.get(job_id)
+        return self._cancel_jobs([job]) > 0 if job else False
+
+    def cancel_group(self, group: Hashable) -> int:
+        """Cancel every unfinished job of a group, e.g. when the user closes the PDF."""
+        jobs = [job for job in list(self._jobs.values()) if job.group == group]
+        return self._cancel_jobs(jobs)
+
+    def _cancel_jobs(self, jobs: List[Job]) -> int:
+        cancelled = [job for job in jobs if job.cancel()]
+        if not cancelled:
+            return 0
+        ids = {job.job_id for job in cancelled}
+        with self._cond:
+            # Drop queued chunks now, so workers never pick them up
+            dropped: Dict[int, int] = {}
+            for name, queue in self._queues.items():
+                kept = deque()
+                for item in queue:
+                    if item[0].job_id in ids:
+                        dropped[item[0].job_id] = dropped.get(item[0].job_id, 0) + 1
+                    else:
+                        kept.append(item)
+                self._queues[name] = kept
+            self.stats["dropped_chunks"] += sum(dropped.values())
+            for job_id in ids:
+                self._jobs.pop(job_id, None)
+            self.stats["cancelled"] += len(cancelled)
+        for job in cancelled:
+            if job.context is not None and dropped.get(job.job_id):
+                job.context.record("dropped_chunks", dropped[job.job_id])
+        return len(cancelled)
+
+    def progress(self, group: Optional[Hashable] = None) -> List[Dict[str, Any]]:
+        """Return progress of unfinished jobs, optionally filtered by group."""
+        return [
+            job.progress() for job in list(self._jobs.values())
+            if group is None or job.group == group
+        ]
+
+    def _activate(self, name: str) -> None:
+        # Caller holds self._cond. A class returning from idle starts at the system virtual time,
+        # so it claims no credit for the time it was empty (and owes none for the time it ran alone)
+        backlogged = [self._virtual[other] for other in self.weights if other != name and self._queues[other]]
+        floor = min(backlogged) if backlogged else self._last_virtual
+        self._virtual[name] = max(self._virtual[name], floor)
+
+    def _next_item(self, interactive_only: bool) -> Optional[Tuple[Job, int]]:
+        # Caller holds self._cond
+        if self._queues[INTERACTIVE]:
+            return self._queues[INTERACTIVE].popleft()
+        if interactive_only:
+            return None
+        ready = [name for name in self.weights if self._queues[name]]
+        if not ready:
+            return None
+        name = min(ready, key=lambda n: self._virtual[n])
+        self._virtual[name] += 1.0 / self.weights[name]
+        self._last_virtual = self._virtual[name]
+        return self._queues[name].popleft()
+
+    def _worker(self, interactive_only: bool) -> None:
+        while True:
+            with self._cond:
+                item = self._next_item(interactive_only)
+                while item is None and not self._shutdown:
+                    self._cond.wait()
+                    item = self._next_item(interactive_only)
+                if item is None:
+                    return
+            job, index = item
+            # A passed deadline fires no callback by itself, so check before spending a worker on it
+            if job.context is not None and job.context.cancelled:
+                job.context.record("dropped_chunks")
+                continue
+            if job.started_at is None:
+                self.stats["wait_seconds"][job.priority].append(time.monotonic() - job.submitted_at)
+            job._run_chunk(index)
+            if job._finished.is_set():
+                with self._cond:
+                    if self._jobs.pop(job.job_id, None) is not None and job.status == "completed":
+                        self.stats["completed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return scheduler statistics, including p95 queue wait per priority class.
+        """
+        waits = {}
+        for name, values in self.stats["wait_seconds"].items():
+            ordered = sorted(values)
+            waits[name] = ordered[int(0.95 * (len(ordered) - 1))] if ordered else None
+        with self._cond:
+            queued = {name: len(queue) for name, queue in self._queues.items()}
+        return {
+            "submitted": self.stats["submitted"],
+            "completed": self.stats["completed"],
+            "cancelled": self.stats["cancelled"],
+            "dropped_chunks": self.stats["dropped_chunks"],
+            "queued_chunks": queued,
+            "p95_wait_seconds": waits,
+        }
+
+    def shutdown(self, cancel_pending: bool = True) -> None:
+        """Stop the workers. Pending jobs are cancelled unless `cancel_pending` is False."""
+        if cancel_pending:
+            self._cancel_jobs(list(self._jobs.values()))
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+
+# Example Usage
+if __name__ == "__main__":
+    def fake_llm_call(text: str, seconds: float) -> str:
+        time.sleep(seconds)
+        return text.upper()
+
+    scheduler = JobScheduler(max_workers=3)
+
+    # A 300-page translation, one chunk per page
+    bulk = scheduler.submit_chunks(
+        [(fake_llm_call, (f"page {i}", 0.02), {}) for i in range(300)],
+        priority=BULK,
+        group="doc-1"
+    )
+    time.sleep(0.1)
+    # Right-click "Explain this" while the bulk job runs
+    for _ in range(20):
+        explain = scheduler.submit(fake_llm_call, "explain this", 0.01, priority=INTERACTIVE, group="doc-1")
+        print(explain.result())
+        time.sleep(0.02)
+
+    print(bulk.progress())
+    # User closes the PDF
+    print("cancelled jobs:", scheduler.cancel_group("doc-1"))
+    print(scheduler.get_stats())
+    scheduler.shutdown()
@@ -0,0 +1,289 @@
+import random
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+from util.llm.router import estimate_tokens
+
+
+_PAGE_NUMBER_RE = re.compile(r"^\s*(page\s*)?[-–]?\s*\d+\s*[-–]?(\s*(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+_WRAP_HYPHEN_RE = re.compile(r"\w-$")
+# Markdown-ish lines that start their own line: headings, list items, table rows, quotes
+_STRUCTURE_RE = re.compile(r"^(#{1,6}\s|[-*+\u2022]\s|\d+[.)]\s|\||>)")
+_SENTENCE_END_RE = re.compile(r"[.!?:;)\"'\u201d\u2019]\s*$")
+_SPACE_RUN_RE = re.compile(r"[ \t ]+")
+_DIGITS_RE = re.compile(r"\d+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+# -- MinHash --
+class MinHasher:
+    """MinHash signatures over word shingles, with LSH banding for near-duplicate lookup."""
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 7) -> None:
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        rng = random.Random(seed)
+        self.perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> Optional[List[int]]:
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return None
+        # crc32 rather than hash(): signatures must be stable across processes to be persisted
+        hashes = {
+            zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode("utf-8"))
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.perms]
+
+    def band_keys(self, signature: List[int]) -> List[tuple]:
+        rows = self.rows
+        return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+# -- Compactor --
+class DocumentCompactor:
+    """
+    Token-saving preprocessing stage applied to `pdf_text` before summarization / translation.
+    # NOTE: Pages are expected to be separated by form feeds ('\\f'), as emitted by most PDF text extractors.
+
+    - Running headers / footers: lines repeated at the same page edge position on many pages
+      (digits masked on short lines, so "Report 2024 - Page 3" == "Report 2024 - Page 4")
+    - Page-number lines, i.e. numeric running footers / headers; numeric body lines are kept
+    - Page breaks end the paragraph, unless a sentence or hyphenated word continues on the next page
+      ("transla-\\fion" -> "translation")
+    - Hard-wrapped lines inside a paragraph are joined and whitespace runs collapsed; headings, list items
+      and table rows keep their own line (skipped in `exact` mode)
+    - Exact and MinHash near-duplicate paragraphs (skipped in `exact` mode)
+
+    `exact=True` is meant for translation: only header, footer and page-number lines are removed and
+    words split across a page break rejoined; line breaks, markdown and body paragraphs are kept as-is.
+    """
+    def __init__(
+        self,
+        exact: bool = False,
+        edge_lines: int = 2,
+        min_repeat_ratio: float = 0.5,
+        min_pages: int = 3,
+        near_duplicate_threshold: float = 0.8,
+        min_duplicate_words: int = 8,
+        max_header_chars: int = 80
+    ) -> None:
+        self.exact = exact
+        self.edge_lines = edge_lines
+        self.max_header_chars = max_header_chars
+        self.min_repeat_ratio = min_repeat_ratio
+        self.min_pages = min_pages
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.min_duplicate_words = min_duplicate_words
+        self.minhasher = MinHasher()
+        self.stats: Dict[str, Any] = {}
+
+    def _line_key(self, line: str) -> str:
+        key = _SPACE_RUN_RE.sub(" ", line.strip().lower())
+        # Only short lines get digits masked, long body lines must repeat verbatim
+        return _DIGITS_RE.sub("#", key) if len(key) <= self.max_header_chars else key
+
+    def _edge_keys(self, lines: List[str]) -> Dict[int, tuple]:
+        """{line index: (edge, offset, key)} for the first/last `edge_lines` non-empty lines of a page."""
+        content = [i for i, line in enumerate(lines) if line.strip()]
+        # Positions alternate bottom / top, inwards; short pages always leave at least one line as body
+        budget = len(content) - 1
+        keys = {}
+        for offset in range(self.edge_lines):
+            for edge, position in (("bottom", -1 - offset), ("top", offset)):
+                if len(keys) >= budget:
+                    return keys
+                i = content[position]
+                keys[i] = (edge, offset, self._line_key(lines[i]))
+        return keys
+
+    def compact(self, pdf_text: str) -> str:
+        """Compact a full document; pages split on '\\f'."""
+        return self.compact_pages(pdf_text.split("\f"))
+
+    def compact_pages(self, pages: Iterable[str]) -> str:
+        """
+        Compact a document given page by page.
+        Pages are consumed once: edge-line frequencies are counted as pages stream in.
+        """
+        page_lines: List[List[str]] = []
+        edge_counts: Counter = Counter()
+        chars_before = 0
+        for page in pages:
+            chars_before += len(page)
+            lines = page.splitlines()
+            page_lines.append(lines)
+            edge_counts.update(self._edge_keys(lines).values())
+
+        num_pages = len(page_lines)
+        repeated = set()
+        if num_pages >= self.min_pages:
+            min_count = max(2, int(num_pages * self.min_repeat_ratio))
+            repeated = {key for key, count in edge_counts.items() if count >= min_count and key[2]}
+
+        removed_header_lines = 0
+        removed_page_numbers = 0
+        kept_pages = []
+        for lines in page_lines:
+            edge = self._edge_keys(lines)
+            kept = []
+            for i, line in enumerate(lines):
+                if edge.get(i) in repeated:
+                    if _PAGE_NUMBER_RE.match(line):
+                        removed_page_numbers += 1
+                    else:
+                        removed_header_lines += 1
+                    continue
+                kept.append(line)
+            page_text = "\n".join(kept).strip("\n")
+            if page_text.strip():
+                kept_pages.append(page_text)
+
+        hyphen_repairs = 0
+        text = kept_pages[0] if kept_pages else ""
+        for page_text in kept_pages[1:]:
+            separator = self._page_separator(text, page_text)
+            if separator == "\n" and _WRAP_HYPHEN_RE.search(text.rstrip()):
+                # Word split across the page break
+                text = text.rstrip()[:-1] + page_text.lstrip()
+                hyphen_repairs += 1
+            else:
+                text += separator + page_text
+
+        # Paragraphs: blank-line separated
+        paragraphs = []
+        for block in re.split(r"\n\s*\n", text):
+            if self.exact:
+                paragraph = "\n".join(line.rstrip() for line in block.splitlines()).strip("\n")
+            else:
+                paragraph, repairs = self._join_wrapped(block.splitlines())
+                hyphen_repairs += repairs
+            if paragraph.strip():
+                paragraphs.append(paragraph)
+
+        removed_duplicates = 0
+        removed_near_duplicates = 0
+        if not self.exact:
+            paragraphs, removed_duplicates, removed_near_duplicates = self._drop_duplicates(paragraphs)
+
+        compacted = "\n\n".join(paragraphs)
+        tokens_before = max(1, chars_before // 4)
+        tokens_after = estimate_tokens(compacted) if compacted else 0
+        self.stats = {
+            "exact": self.exact,
+            "pages": num_pages,
+            "removed_header_footer_lines": removed_header_lines,
+            "removed_page_numbers": removed_page_numbers,
+            "hyphen_repairs": hyphen_repairs,
+            "removed_duplicate_paragraphs": removed_duplicates,
+            "removed_near_duplicate_paragraphs": removed_near_duplicates,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+        }
+        return compacted
+
+    @staticmethod
+    def _join_wrapped(lines: List[str]):
+        """Join hard-wrapped lines (repairing hyphenated wraps); structural lines keep their own line."""
+        out: List[str] = []
+        repairs = 0
+        for line in (_SPACE_RUN_RE.sub(" ", line).strip() for line in lines):
+            if not line:
+                continue
+            if out and not _STRUCTURE_RE.match(line) and not out[-1].startswith(("#", "|")):
+                if _WRAP_HYPHEN_RE.search(out[-1]) and line[:1].islower():
+                    out[-1] = out[-1][:-1] + line
+                    repairs += 1
+                else:
+                    out[-1] += " " + line
+            else:
+                out.append(line)
+        return "\n".join(out), repairs
+
+    @staticmethod
+    def _page_separator(previous: str, page_text: str) -> str:
+        """'\\n' when the previous page runs on into this one (hyphenated word, unfinished sentence), else '\\n\\n'."""
+        last_line = previous.rstrip().rsplit("\n", 1)[-1]
+        first_line = page_text.lstrip()
+        if not first_line[:1].islower():
+            return "\n\n"
+        if last_line.endswith("-") or not _SENTENCE_END_RE.search(last_line):
+            return "\n"
+        return "\n\n"
+
+    def _drop_duplicates(self, paragraphs: List[str]):
+        seen_exact = set()
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        signatures: Dict[int, List[int]] = {}
+        kept = []
+        exact_dups = 0
+        near_dups = 0
+        for paragraph in paragraphs:
+            key = _SPACE_RUN_RE.sub(" ", paragraph.lower())
+            if key in seen_exact:
+                exact_dups += 1
+                continue
+            seen_exact.add(key)
+
+            if len(paragraph.split()) >= self.min_duplicate_words:
+                signature = self.minhasher.signature(paragraph)
+                if signature is not None:
+                    bands = self.minhasher.band_keys(signature)
+                    candidates = {idx for band in bands for idx in buckets.get(band, ())}
+                    if any(
+                        self.minhasher.similarity(signature, signatures[idx]) >= self.near_duplicate_threshold
+                        for idx in candidates
+                    ):
+                        near_dups += 1
+                        continue
+                    idx = len(kept)
+                    signatures[idx] = signature
+                    for band in bands:
+                        buckets[band].append(idx)
+            kept.append(paragraph)
+        return kept, exact_dups, near_dups
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return statistics about the last compaction, including tokens saved.
+        """
+        return self.stats
+
+
+# Example Usage
+if __name__ == "__main__":
+    disclaimer = (
+        "This document is confidential and intended solely for the use of the individual "
+        "or entity to whom it is addressed."
+    )
+    topics = ["revenue", "operating costs", "headcount", "capital expenditure", "outlook"]
+    pages = []
+    for i, topic in enumerate(topics, start=1):
+        pages.append(
+            f"ACME Corp Annual Report 2024\n\n"
+            f"This section reviews {topic} for the year. Figures for {topic} were prepared by the\n"
+            f"finance team and reconciled against the audited {topic} state-\nments of each subsidiary.\n\n"
+            f"{disclaimer}\n"
+            f"{disclaimer}\n\n"
+            f"Page {i} of 5"
+        )
+    pdf_text = "\f".join(pages)
+
+    compactor = DocumentCompactor()
+    print(compactor.compact(pdf_text))
+    print(compactor.get_stats())
+
+    exact = DocumentCompactor(exact=True)
+    exact.compact(pdf_text)
+    print(exact.get_stats())
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from util.text.compaction import MinHasher
+
+
+def normalize_segment(text: str) -> str:
+    """Normalization used for keys: case-folded, whitespace collapsed."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def segment_hash(text: str) -> str:
+    return hashlib.sha1(normalize_segment(text).encode("utf-8")).hexdigest()
+
+
+def split_segments(pdf_text: str) -> List[str]:
+    """Translation segments are paragraphs (blank-line separated)."""
+    return [p.strip() for p in re.split(r"\n\s*\n", pdf_text) if p.strip()]
+
+
+# -- Translation memory --
+class TranslationMemory:
+    """
+    Persistent translation memory for TranslationService.
+    # NOTE: Stored in SQLite; the fuzzy (MinHash LSH) index is rebuilt in memory from stored signatures on open.
+
+    - Exact store keyed by (source_language, target_language, normalized segment hash)
+    - Fuzzy index: MinHash LSH over word shingles, for near matches used as context hints
+    """
+    _STAT_KEYS = {"exact": "exact_hits", "fuzzy": "fuzzy_hits", None: "misses"}
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        hint_threshold: float = 0.6,
+        min_fuzzy_words: int = 6
+    ) -> None:
+        self.db_path = db_path or os.path.join(os.path.expanduser("~"), ".pdf_dive", "translation_memory.db")
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.hint_threshold = hint_threshold
+        self.min_fuzzy_words = min_fuzzy_words
+        self.minhasher = MinHasher()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                source_language TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                segment_hash TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                target_text TEXT NOT NULL,
+                signature TEXT,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (source_language, target_language, segment_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+        # (source_language, target_language, band key) -> [segment_hash]
+        self._buckets: Dict[tuple, List[str]] = defaultdict(list)
+        self._signatures: Dict[Tuple[str, str, str], List[int]] = {}
+        rows = self._conn.execute(
+            "SELECT source_language, target_language, segment_hash, signature FROM segments WHERE signature IS NOT NULL"
+        )
+        for source_language, target_language, seg_hash, signature in rows:
+            self._index(source_language, target_language, seg_hash, json.loads(signature))
+
+        self.stats = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "fuzzy_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "saved_tokens": 0,
+            "saved_seconds": 0.0,
+        }
+
+    def _index(self, source_language: str, target_language: str, seg_hash: str, signature: List[int]) -> None:
+        self._signatures[(source_language, target_language, seg_hash)] = signature
+        for band in self.minhasher.band_keys(signature):
+            self._buckets[(source_language, target_language, band)].append(seg_hash)
+
+    @staticmethod
+    def _languages(source_language: str, target_language: str) -> Tuple[str, str]:
+        return source_language.strip().lower(), target_language.strip().lower()
+
+    def lookup(self, segment: str, source_language: str, target_language: str, record: bool = True) -> Dict[str, Any]:
+        """
+        Look up one segment.
+            :param record: Count the lookup in the hit stats; pass False and call `record_lookups`
+                           once the result is actually used.
+            :return: {'match': 'exact' | 'fuzzy' | None, 'translation': str | None,
+                      'source_text': str | None, 'similarity': float}
+        """
+        result = self._lookup(segment, source_language, target_language)
+        if record:
+            self.record_lookups(**{self._STAT_KEYS[result["match"]]: 1})
+        return result
+
+    def record_lookups(self, exact_hits: int = 0, fuzzy_hits: int = 0, misses: int = 0) -> None:
+        """Count lookups made with `record=False`."""
+        with self._lock:
+            self.stats["lookups"] += exact_hits + fuzzy_hits + misses
+            self.stats["exact_hits"] += exact_hits
+            self.stats["fuzzy_hits"] += fuzzy_hits
+            self.stats["misses"] += misses
+
+    def _lookup(self, segment: str, source_language: str, target_language: str) -> Dict[str, Any]:
+        source_language, target_language = self._languages(source_language, target_language)
+        seg_hash = segment_hash(segment)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_text, target_text FROM segments "
+                "WHERE source_language = ? AND target_language = ? AND segment_hash = ?",
+                (source_language, target_language, seg_hash)
+            ).fetchone()
+            if row:
+                return {"match": "exact", "translation": row[1], "source_text": row[0], "similarity": 1.0}
+
+            best_hash, best_similarity = None, 0.0
+            signature = self._signature(segment)
+            if signature is not None:
+                candidates = {
+                    candidate
+                    for band in self.minhasher.band_keys(signature)
+                    for candidate in self._buckets.get((source_language, target_language, band), ())
+                }
+                for candidate in candidates:
+                    similarity = MinHasher.similarity(signature, self._signatures[(source_language, target_language, candidate)])
+                    if similarity > best_similarity:
+                        best_hash, best_similarity = candidate, similarity
+
+            if best_hash is not None and best_similarity >= self.hint_threshold:
+                row = self._conn.execute(
+                    "SELECT source_text, target_text FROM segments "
+                    "WHERE source_language = ? AND target_language = ? AND segment_hash = ?",
+                    (source_language, target_language, best_hash)
+                ).fetchone()
+                return {"match": "fuzzy", "translation": row[1], "source_text": row[0], "similarity": best_similarity}
+
+            return {"match": None, "translation": None, "source_text": None, "similarity": best_similarity}
+
+    def _signature(self, segment: str) -> Optional[List[int]]:
+        if len(segment.split()) < self.min_fuzzy_words:
+            return None
+        return self.minhasher.signature(segment)
+
+    def store(self, segment: str, translation: str, source_language: str, target_language: str) -> None:
+        """Store (or overwrite) the translation of one segment."""
+        source_language, target_language = self._languages(source_language, target_language)
+        seg_hash = segment_hash(segment)
+        signature = self._signature(segment)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source_language, target_language, seg_hash, segment, translation,
+                    json.dumps(signature) if signature is not None else None, time.time()
+                )
+            )
+            self._conn.commit()
+            if signature is not None and (source_language, target_language, seg_hash) not in self._signatures:
+                self._index(source_language, target_language, seg_hash, signature)
+            self.stats["stored"] += 1
+
+    def record_savings(self, tokens: int, seconds: float) -> None:
+        """Record LLM tokens and latency avoided thanks to exact hits."""
+        with self._lock:
+            self.stats["saved_tokens"] += tokens
+            self.stats["saved_seconds"] += seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit rates and savings.
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats["segments"] = self._conn.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        lookups = stats["lookups"] or 1
+        stats["exact_hit_rate"] = stats["exact_hits"] / lookups
+        stats["fuzzy_hit_rate"] = stats["fuzzy_hits"] / lookups
+        return stats
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# Example Usage
+if __name__ == "__main__":
+    memory = TranslationMemory(db_path=":memory:")
+    disclaimer = "Dieses Dokument ist vertraulich und nur für den Gebrauch des Empfängers bestimmt."
+    memory.store(disclaimer, "This document is confidential and intended solely for the recipient.", "German", "English")
+
+    print(memory.lookup(disclaimer, "german", "english"))
+    print(memory.lookup(disclaimer.replace("vertraulich", "streng vertraulich"), "german", "english"))
+    print(memory.lookup("Ein völlig anderer Absatz über das Wetter im Sommer.", "german", "english"))
+    print(memory.get_stats())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Services import their helpers as `util.*`, relative to ai_core/service
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "service")
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
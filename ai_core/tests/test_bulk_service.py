@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from bulk_service import BulkJobRunner, BulkManifest
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(2):
+        paragraphs = [f"Document {i} paragraph {j} has a handful of words to translate." for j in range(40)]
+        (docs / f"doc{i}.txt").write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return str(docs)
+
+
+def _runner(**kwargs):
+    return BulkJobRunner(task="translate", llm_type="mock", llm_api_key="mock", chunk_tokens=100, **kwargs)
+
+
+def test_resume_reruns_only_missing_chunks(input_dir, tmp_path):
+    output_dir = str(tmp_path / "out")
+    first = _runner().run(input_dir, output_dir)
+    assert first["documents"] == 2 and first["chunks_run"] > 4
+
+    # Simulate a crash: drop the last two chunk records and the 'done' records
+    manifest_path = os.path.join(output_dir, "manifest.jsonl")
+    with open(manifest_path, encoding="utf-8") as file:
+        events = [json.loads(line) for line in file]
+    chunk_indexes = [i for i, event in enumerate(events) if event["event"] == "chunk"]
+    lost = set(chunk_indexes[-2:])
+    kept = [event for i, event in enumerate(events) if i not in lost and event["event"] != "done"]
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        file.write("".join(json.dumps(event) + "\n" for event in kept))
+        file.write('{"event": "chunk", "doc"')  # truncated last line
+
+    second = _runner().run(input_dir, output_dir)
+    assert second["documents"] == 2
+    assert second["chunks_run"] == 2
+    assert second["chunks_resumed"] == first["chunks_run"] - 2
+
+
+def test_finished_run_is_skipped(input_dir, tmp_path):
+    output_dir = str(tmp_path / "out")
+    _runner().run(input_dir, output_dir)
+    again = _runner().run(input_dir, output_dir)
+    assert again["skipped"] == 2 and again["chunks_run"] == 0
+
+
+@pytest.mark.parametrize("change", [
+    {"llm_model_name": "mock-echo"},
+    {"source_language": "german"},
+    {"target_language": "french"},
+])
+def test_changed_settings_invalidate_checkpoints(input_dir, tmp_path, change):
+    output_dir = str(tmp_path / "out")
+    first = _runner().run(input_dir, output_dir)
+    again = _runner(**change).run(input_dir, output_dir)
+    assert again["skipped"] == 0
+    assert again["chunks_resumed"] == 0
+    assert again["chunks_run"] == first["chunks_run"]
+
+
+def test_llm_calls_run_up_to_max_concurrency(input_dir, tmp_path):
+    # More than the default asyncio executor allows, min(32, cpus + 4)
+    runner = BulkJobRunner(task="translate", llm_type="mock", llm_api_key="mock", chunk_tokens=10, max_concurrency=40)
+    lock = threading.Lock()
+    running = [0, 0]  # current, peak
+
+    def call_llm(text, context=None):
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+        return text
+
+    runner._call_llm = call_llm
+    stats = runner.run(input_dir, str(tmp_path / "out"))
+    assert stats["documents"] == 2
+    assert running[1] == 40
+
+
+def test_cancelled_run_skips_extraction(input_dir, tmp_path):
+    from util.request_context import RequestContext
+
+    context = RequestContext()
+    context.cancel()
+    output_dir = str(tmp_path / "out")
+    stats = _runner().run(input_dir, output_dir, context=context)
+    assert stats["cancelled"] == 2 and stats["chunks_run"] == 0
+    with open(os.path.join(output_dir, "manifest.jsonl"), encoding="utf-8") as file:
+        assert not [line for line in file if '"start"' in line]
+
+
+def test_manifest_reload(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = BulkManifest(path)
+    manifest.record(event="start", doc="a.txt", fingerprint="f1")
+    manifest.record(event="chunk", doc="a.txt", chunk="0", result="done 0")
+    manifest.close()
+
+    reopened = BulkManifest(path)
+    assert reopened.chunk_result("a.txt", "0") == "done 0"
+    assert not reopened.is_done("a.txt", "f1")
+    reopened.close()
@@ -0,0 +1,87 @@
+from util.text.compaction import DocumentCompactor, MinHasher
+
+
+def _report(pages):
+    return "\f".join(
+        f"ACME Corp Annual Report 2024\n\n{body}\n\nPage {i} of {len(pages)}"
+        for i, body in enumerate(pages, start=1)
+    )
+
+
+def test_exact_mode_keeps_numeric_body_lines():
+    compactor = DocumentCompactor(exact=True)
+    text = compactor.compact("Revenue by year:\n2022\n2023\n2024")
+    assert text.split() == ["Revenue", "by", "year:", "2022", "2023", "2024"]
+    assert compactor.get_stats()["removed_page_numbers"] == 0
+
+
+def test_numeric_lines_inside_pages_survive_page_number_removal():
+    pages = [
+        f"Section {i} lists headcount per year.\n\nTable {i}:\n{2020 + i}\n{2021 + i}\n\nSection {i} totals are audited."
+        for i in range(4)
+    ]
+    pdf_text = "\f".join(f"{page}\n{number}" for number, page in enumerate(pages, start=1))
+    compactor = DocumentCompactor(exact=True)
+    text = compactor.compact(pdf_text)
+    for i in range(4):
+        assert str(2020 + i) in text and str(2021 + i) in text
+    assert compactor.get_stats()["removed_page_numbers"] == 4
+
+
+def test_headers_footers_and_page_numbers_removed():
+    compactor = DocumentCompactor(exact=True)
+    text = compactor.compact(_report([f"Section {i} body text." for i in range(5)]))
+    assert "ACME" not in text and "Page" not in text
+    assert text.split("\n\n") == [f"Section {i} body text." for i in range(5)]
+
+
+def test_page_break_ends_paragraph_unless_text_continues():
+    pdf_text = "\f".join([
+        "First page ends a sentence.\n7",
+        "Second page starts fresh and is cut mid\n8",
+        "sentence, then a word is split by hyphen-\n9",
+        "ation across the break.\n10",
+    ])
+    text = DocumentCompactor(exact=True).compact(pdf_text)
+    assert text.split("\n\n") == [
+        "First page ends a sentence.",
+        "Second page starts fresh and is cut mid\nsentence, then a word is split by hyphenation across the break.",
+    ]
+
+
+def test_exact_mode_keeps_lists_tables_and_hyphenated_words():
+    text = (
+        "# Overview\nThe plan has three steps:\n- collect data\n- clean it\n- well-\nknown results\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2 |"
+    )
+    compactor = DocumentCompactor(exact=True)
+    assert compactor.compact(text) == text
+    assert compactor.stats["hyphen_repairs"] == 0
+
+    # Outside exact mode wraps are joined, but structural lines keep their own line
+    lines = DocumentCompactor().compact(text).splitlines()
+    assert lines[:4] == ["# Overview", "The plan has three steps:", "- collect data", "- clean it"]
+    assert lines[-3:] == ["| a | b |", "|---|---|", "| 1 | 2 |"]
+
+
+def test_duplicates_dropped_only_outside_exact_mode():
+    disclaimer = (
+        "This document is confidential and intended solely for the use of the individual or entity to whom "
+        "it is addressed. If you have received it in error, please notify the sender immediately and delete "
+        "every copy, including attachments, from your systems without reading, copying or forwarding it."
+    )
+    near = disclaimer.replace("immediately", "promptly")
+    pdf_text = f"Body one.\n\n{disclaimer}\n\n{disclaimer}\n\n{near}\n\nBody two."
+
+    compactor = DocumentCompactor()
+    paragraphs = compactor.compact(pdf_text).split("\n\n")
+    assert paragraphs == ["Body one.", disclaimer, "Body two."]
+    assert compactor.get_stats()["removed_duplicate_paragraphs"] == 1
+    assert compactor.get_stats()["removed_near_duplicate_paragraphs"] == 1
+
+    assert len(DocumentCompactor(exact=True).compact(pdf_text).split("\n\n")) == 5
+
+
+def test_minhash_signature_is_stable():
+    text = "the quick brown fox jumps over the lazy dog again"
+    assert MinHasher().signature(text) == MinHasher().signature(text)
@@ -0,0 +1,61 @@
+from highlight_service import HighlightService
+from rag_service import DocumentShard
+
+
+PDF_TEXT = """
+Antonio Luna was a Filipino army general and a pharmacist who fought in the Philippine-American War.
+
+He organized professional guerrilla soldiers later named the Luna Sharpshooters and the Black Guard.
+
+His three-tier defense, now known as the Luna Defense Line, gave the American troops a difficult endeavor.
+"""
+
+ANSWER = (
+    "Luna was a pharmacist who fought in the Philippine-American War. "
+    "Later he built a three-tier defense, now known as the Luna Defense Line."
+)
+
+
+def test_match_maps_answer_to_paragraphs():
+    index = HighlightService.from_text(PDF_TEXT)
+    assert [hit["para_id"] for hit in index.match(ANSWER)] == [0, 2]
+    assert index.match("Nothing in this sentence appears in the source text.") == []
+
+
+def test_dict_paragraph_ids_are_returned():
+    index = HighlightService({"p-a": "the quick brown fox jumps", "p-b": "over the lazy sleeping dog"})
+    assert index.match("a quick brown fox jumps high")[0]["para_id"] == "p-a"
+
+
+def test_stream_matches_across_chunk_boundaries():
+    index = HighlightService.from_text(PDF_TEXT)
+    stream = index.open_stream()
+    found = []
+    # Chunks split words, as token streams do
+    for i in range(0, len(ANSWER), 7):
+        found.extend(stream.feed(ANSWER[i:i + 7]))
+    found.extend(stream.close())
+    assert found == [0, 2]
+    assert stream.highlighted == found
+
+
+def test_paragraph_ids_match_document_shard():
+    pdf_text = PDF_TEXT.replace("\n\nHe organized", "\fHe organized")
+    index = HighlightService.from_text(pdf_text)
+    shard = DocumentShard("doc-1", pdf_text)
+    assert index.stats["num_paragraphs"] == len(shard.paragraphs) == 3
+    para_ids = [hit["para_id"] for hit in index.match(ANSWER)]
+    assert para_ids == [hit["para_id"] for hit in HighlightService.from_shard(shard).match(ANSWER)]
+    assert "Luna Defense Line" in shard.paragraphs[para_ids[-1]]
+
+
+def test_explain_returns_highlights():
+    from explain_service import ExplainService
+
+    response = ExplainService(llm_type="mock", llm_api_key="mock").explain(
+        llm_model_name="mock-echo",
+        instructions="Explain.",
+        prompt_inputs={"selected_text": ANSWER, "max_words": 50},
+        highlighter=HighlightService.from_text(PDF_TEXT)
+    )
+    assert response["highlights"] == [0, 2]
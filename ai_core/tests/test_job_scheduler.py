@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from util.scheduler.job_scheduler import BACKGROUND, BULK, INTERACTIVE, JobCancelledError, JobScheduler
+
+
+@pytest.fixture
+def scheduler():
+    # One shared worker: background / bulk chunks are dispatched strictly one at a time
+    scheduler = JobScheduler(max_workers=2, reserved_interactive=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _record(order, label):
+    order.append(label)
+
+
+def _interleave(scheduler, warm_up_priority):
+    # The warm-up class runs alone first, building up virtual time
+    scheduler.submit_chunks([(lambda: None, (), {}) for _ in range(200)], priority=warm_up_priority).result(timeout=10)
+
+    gate = threading.Event()
+    blocker = scheduler.submit(gate.wait, 10, priority=warm_up_priority)
+    while blocker.status != "running":
+        time.sleep(0.001)
+
+    order = []
+    bulk = scheduler.submit_chunks([(_record, (order, BULK), {}) for _ in range(100)], priority=BULK)
+    background = scheduler.submit_chunks([(_record, (order, BACKGROUND), {}) for _ in range(100)], priority=BACKGROUND)
+    gate.set()
+    bulk.result(timeout=10)
+    background.result(timeout=10)
+    return order
+
+
+@pytest.mark.parametrize("warm_up_priority", [BACKGROUND, BULK])
+def test_weighted_share_after_idle(scheduler, warm_up_priority):
+    order = _interleave(scheduler, warm_up_priority)
+    # Default weights are background 4 : bulk 1, whichever class ran alone before
+    window = order[:50]
+    assert 8 <= window.count(BULK) <= 12
+    assert 38 <= window.count(BACKGROUND) <= 42
+
+
+def test_interactive_runs_before_queued_chunks(scheduler):
+    gate = threading.Event()
+    scheduler.submit(gate.wait, 10, priority=BULK)
+    order = []
+    bulk = scheduler.submit_chunks([(_record, (order, BULK), {}) for _ in range(20)], priority=BULK)
+    explain = scheduler.submit(_record, order, INTERACTIVE, priority=INTERACTIVE)
+    explain.result(timeout=5)
+    assert order == [INTERACTIVE]
+    gate.set()
+    bulk.result(timeout=5)
+
+
+def test_cancel_group_drops_queued_chunks(scheduler):
+    gate = threading.Event()
+    blocker = scheduler.submit(gate.wait, 10, priority=BULK, group="doc-1")
+    while blocker.status != "running":
+        time.sleep(0.001)
+    order = []
+    job = scheduler.submit_chunks([(_record, (order, BULK), {}) for _ in range(30)], priority=BULK, group="doc-1")
+
+    assert scheduler.cancel_group("doc-1") == 2
+    gate.set()
+    with pytest.raises(JobCancelledError):
+        job.result(timeout=5)
+    with pytest.raises(JobCancelledError):
+        blocker.result(timeout=5)
+    stats = scheduler.get_stats()
+    assert stats["dropped_chunks"] == 30
+    assert stats["queued_chunks"][BULK] == 0
+    assert order == []
+    assert job.progress()["status"] == "cancelled"
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from prefetch_service import PrefetchService
+from rag_service import WorkspaceIndex
+from util.scheduler.job_scheduler import BULK, JobScheduler
+
+
+PDF_TEXT = "\f".join(
+    f"Report 2024\n\nSection {i} covers topic {i} in detail with several findings.\n\nPage {i}"
+    for i in range(1, 6)
+)
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def summarize(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"markdown_content": "summary"}
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = JobScheduler(max_workers=2, reserved_interactive=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_summary_uses_prefetched_prompt_and_workspace_gets_shard(scheduler):
+    summarizer = RecordingSummarizer()
+    workspace = WorkspaceIndex()
+    prefetch = PrefetchService(scheduler, summarizer=summarizer, output_model=dict, workspace=workspace)
+    prefetch.open("doc-1", pdf_text=PDF_TEXT)
+    _wait(lambda: prefetch.get_stats()["summary"]["prefetched"] == 1)
+
+    prompts = prefetch.get("doc-1", "prompts")
+    assert summarizer.calls[0]["prompt"] == prompts["short_summary"]
+    assert prefetch.get_stats()["prompts"]["use_rate"] == 1.0
+    assert workspace.query("topic 3 findings", top_k=1)[0]["doc_id"] == "doc-1"
+    assert prefetch.get_stats()["index"]["use_rate"] == 1.0
+
+    # The highlighter shares the shard's paragraph ids
+    shard = prefetch.get("doc-1", "index")
+    para_id = prefetch.get("doc-1", "highlight").match("Section 3 covers topic 3 in detail")[0]["para_id"]
+    assert shard.paragraphs[para_id].startswith("Section 3")
+
+
+def test_cpu_budget_skips_dependent_stages(scheduler):
+    summarizer = RecordingSummarizer()
+    prefetch = PrefetchService(scheduler, summarizer=summarizer, output_model=dict, max_cpu_seconds=0.0)
+    prefetch.open("doc-1", pdf_text=PDF_TEXT * 50)
+    _wait(lambda: prefetch.get_stats()["summary"]["skipped"] == 1)
+
+    stats = prefetch.get_stats()
+    assert stats["text"]["prefetched"] == 1
+    assert stats["index"]["skipped"] == 1 and stats["prompts"]["skipped"] == 1
+    assert summarizer.calls == []
+
+
+def test_waiting_for_idle_does_not_hold_a_worker(scheduler):
+    busy = threading.Event()
+    busy.set()
+    prefetch = PrefetchService(scheduler, idle_check=lambda: not busy.is_set(), idle_wait_seconds=0.3)
+    prefetch.open("doc-1", pdf_text=PDF_TEXT)
+    time.sleep(0.05)
+
+    # The only shared worker stays free for other background / bulk work
+    start = time.monotonic()
+    scheduler.submit_chunks([(time.sleep, (0,), {}) for _ in range(5)], priority=BULK).result(timeout=5)
+    assert time.monotonic() - start < 0.2
+
+    # Timed out waiting: recorded as skipped, not silently dropped
+    _wait(lambda: prefetch.get_stats()["prompts"]["skipped"] == 1)
+    stats = prefetch.get_stats()
+    assert stats["text"]["skipped"] == 1 and stats["index"]["skipped"] == 1
+
+
+def test_close_cancels_pending_stages(scheduler):
+    busy = threading.Event()
+    busy.set()
+    prefetch = PrefetchService(scheduler, idle_check=lambda: not busy.is_set())
+    prefetch.open("doc-1", pdf_text=PDF_TEXT)
+    time.sleep(0.1)
+    prefetch.close("doc-1")
+    busy.clear()
+    time.sleep(0.2)
+    assert prefetch.get("doc-1", "text") is None
+    assert prefetch.get_stats()["text"]["prefetched"] == 0
+
+
+def test_close_removes_shard_from_workspace(scheduler):
+    workspace = WorkspaceIndex()
+    prefetch = PrefetchService(scheduler, workspace=workspace)
+    prefetch.open("doc-1", pdf_text=PDF_TEXT)
+    _wait(lambda: prefetch.get_stats()["index"]["prefetched"] == 1)
+    assert workspace.get_stats()["documents"] == 1
+
+    prefetch.close("doc-1")
+    assert workspace.get_stats()["documents"] == 0
+    assert workspace.query("topic 3 findings") == []
+    # Never queried, so the prefetched shard counts as unused
+    assert prefetch.get_stats()["index"]["unused_on_close"] == 1
@@ -0,0 +1,53 @@
+from rag_service import WorkspaceIndex
+
+
+def _document(topic, pages=3):
+    return "\f".join(
+        f"{topic} overview for page {page}.\n\nThe {topic} figures on page {page} were audited."
+        for page in range(1, pages + 1)
+    )
+
+
+def test_add_query_remove():
+    index = WorkspaceIndex()
+    index.add_documents({"a": _document("revenue"), "b": _document("headcount")}, max_workers=1)
+    assert index.get_stats()["documents"] == 2
+
+    hits = index.query("headcount audited", top_k=3)
+    assert {hit["doc_id"] for hit in hits} == {"b"}
+    assert hits[0]["page"] in (1, 2, 3) and "headcount" in hits[0]["text"].lower()
+
+    assert index.remove_document("b")
+    assert not index.remove_document("b")
+    assert index.query("headcount") == []
+    assert index.get_stats()["documents"] == 1
+
+
+def test_stats_are_incremental():
+    index = WorkspaceIndex()
+    index.add_document("a", _document("revenue"))
+    before = index.get_stats()
+    index.add_document("b", _document("headcount"))
+    index.remove_document("b")
+    assert index.get_stats() == before
+
+    # Re-indexing a document replaces it
+    index.add_document("a", _document("revenue", pages=1))
+    assert index.get_stats()["paragraphs"] == 2
+
+
+def test_query_of_only_common_terms_still_matches():
+    index = WorkspaceIndex()
+    index.add_document("a", "\n\n".join(f"Revenue line {i} for the quarter." for i in range(30)))
+    assert len(index.query("revenue", top_k=5)) == 5
+    # With a rare term present, the common term is only dropped from scoring
+    assert index.query("revenue 17", top_k=1)[0]["text"] == "Revenue line 17 for the quarter."
+
+
+def test_doc_filter_and_parallel_build():
+    documents = {f"doc-{i}": _document(f"topic{i}") for i in range(4)}
+    index = WorkspaceIndex()
+    index.add_documents(documents, max_workers=2)
+    assert index.get_stats()["documents"] == 4
+    hits = index.query("topic1 topic2", top_k=10, doc_ids=["doc-2"])
+    assert hits and {hit["doc_id"] for hit in hits} == {"doc-2"}
@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from util.llm.general import GeneralLLMFactory
+from util.request_context import DeadlineExceeded, RequestCancelled, RequestContext
+
+
+def _slow_mock(latency_seconds: float):
+    llm = GeneralLLMFactory.create_llm("mock", "mock")
+    llm.latency_seconds = latency_seconds
+    return llm
+
+
+def _cancel_after(context: RequestContext, seconds: float) -> None:
+    threading.Timer(seconds, context.cancel).start()
+
+
+def test_cancel_aborts_stream_mid_generation():
+    llm = _slow_mock(2.0)
+    context = RequestContext()
+    _cancel_after(context, 0.2)
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        llm.generate(" ".join(["word"] * 40), "mock-echo", "Echo.", context=context)
+    assert time.monotonic() - start < 1.0
+    stats = context.get_stats()
+    assert stats["cancelled"] and stats["aborted_streams"] == 1
+    assert stats["streamed_chars_before_abort"] > 0
+
+
+def test_deadline_raises_deadline_exceeded():
+    llm = _slow_mock(2.0)
+    context = RequestContext(deadline_seconds=0.3)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        llm.generate(" ".join(["word"] * 40), "mock-echo", "Echo.", context=context)
+    assert time.monotonic() - start < 1.0
+    # Later calls are skipped without reaching the provider
+    with pytest.raises(DeadlineExceeded):
+        llm.generate("hello", "mock-echo", "Echo.", context=context)
+    assert context.get_stats()["skipped_calls"] == 1
+
+
+def test_cancel_releases_stalled_generator():
+    def stalled():
+        yield "first "
+        time.sleep(3)
+        yield "never read"
+
+    context = RequestContext()
+    _cancel_after(context, 0.2)
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        context.stream(stalled(), lambda piece: piece)
+    assert time.monotonic() - start < 1.0
+
+
+def test_scheduler_job_cancelled_with_context():
+    from util.scheduler.job_scheduler import BULK, JobCancelledError, JobScheduler
+
+    scheduler = JobScheduler(max_workers=2, reserved_interactive=1)
+    try:
+        gate = threading.Event()
+        context = RequestContext()
+        job = scheduler.submit_chunks(
+            [(gate.wait, (5,), {})] + [(time.sleep, (0,), {}) for _ in range(10)],
+            priority=BULK,
+            context=context
+        )
+        context.cancel()
+        gate.set()
+        with pytest.raises(JobCancelledError):
+            job.result(timeout=5)
+        assert context.get_stats()["dropped_chunks"] >= 10
+    finally:
+        scheduler.shutdown()
+
+
+def test_long_lived_context_does_not_accumulate_callbacks():
+    from util.scheduler.job_scheduler import INTERACTIVE, JobScheduler
+
+    context = RequestContext()
+    for _ in range(1000):
+        assert context.stream(iter(["a", "b"]), lambda piece: piece) == "ab"
+        context.stream((piece for piece in ["c"]), lambda piece: piece)
+    assert len(context._callbacks) == 0
+
+    scheduler = JobScheduler(max_workers=2, reserved_interactive=1)
+    try:
+        jobs = [
+            scheduler.submit(lambda context: None, priority=INTERACTIVE, context=context) for _ in range(200)
+        ]
+        for job in jobs:
+            job.result(timeout=5)
+        assert len(context._callbacks) == 0
+    finally:
+        scheduler.shutdown()
+
+
+def test_structured_summary_aborted_on_cancel():
+    pydantic = pytest.importorskip("pydantic")
+    from summarization_service import OverviewSummarization
+
+    class SummaryOutputModel(pydantic.BaseModel):
+        markdown_content: str
+        followup_questions: List[str]
+
+    service = OverviewSummarization(llm_type="mock", llm_api_key="mock")
+    service.llm.latency_seconds = 2.0
+    context = RequestContext()
+    _cancel_after(context, 0.2)
+    start = time.monotonic()
+    with pytest.raises(RequestCancelled):
+        service.summarize(
+            llm_model_name="mock-echo",
+            instructions="You are a summarization expert.",
+            output_model=SummaryOutputModel,
+            prompt_inputs={
+                "pdf_text": "The user closes the tab mid-summary. " * 20,
+                "num_core_points": 3,
+                "num_detailed_points": 3,
+                "num_followup_questions": 3
+            },
+            prompt_config={"prompt_category": "overview", "prompt_worker": "summarizer", "prompt_type": "short"},
+            context=context
+        )
+    assert time.monotonic() - start < 1.0
+    assert context.get_stats()["aborted_streams"] == 1
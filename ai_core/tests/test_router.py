@@ -0,0 +1,47 @@
+import pytest
+
+from explain_service import ExplainService
+from translation_service import TranslationService
+from util.llm.general import GeneralLLMFactory
+from util.llm.router import LLMRouter, get_router
+
+
+class FailingLLM:
+    def generate(self, **kwargs):
+        raise RuntimeError("provider down")
+
+
+def test_services_share_one_router_per_mode():
+    first = ExplainService(llm_type="mock", llm_api_key="mock")
+    second = TranslationService(llm_type="mock", llm_api_key="mock")
+    assert first.router is second.router is get_router("general")
+
+    before = get_router("general").get_stats().get("mock/mock-echo", {}).get("count", 0)
+    for service in (first, ExplainService(llm_type="mock", llm_api_key="mock")):
+        service.explain(
+            llm_model_name=None,
+            instructions="Explain.",
+            prompt_inputs={"selected_text": "Shared routers see every request.", "max_words": 10}
+        )
+    assert get_router("general").get_stats()["mock/mock-echo"]["count"] == before + 2
+
+
+def test_injected_router_is_used():
+    router = LLMRouter(mode="general")
+    service = ExplainService(llm_type="mock", llm_api_key="mock", router=router)
+    assert service.router is router
+
+
+def test_generate_with_decision_returns_own_decision():
+    router = LLMRouter(mode="general")
+    llm = GeneralLLMFactory.create_llm("mock", "mock")
+    response, decision = router.generate_with_decision({"mock": llm}, "hello there", "Echo.")
+    assert response.startswith("[mock-echo]")
+    assert decision["model"] == "mock-echo" and decision["attempts"][0]["failed"] is False
+
+
+def test_failures_are_recorded_and_raised():
+    router = LLMRouter(mode="general")
+    with pytest.raises(ValueError):
+        router.generate({"mock": FailingLLM()}, "hello", "Echo.")
+    assert router.get_stats()["mock/mock-echo"]["error_rate"] == 1.0
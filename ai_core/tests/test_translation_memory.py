@@ -0,0 +1,107 @@
+import re
+
+import pytest
+
+from translation_service import TranslationService
+from util.text.translation_memory import TranslationMemory
+
+
+DISCLAIMER = "Dieses Dokument ist vertraulich und nur für den Gebrauch des Empfängers bestimmt."
+NEAR_DISCLAIMER = "Dieses Dokument ist vertraulich und nur für den Gebrauch des Empfängers gedacht."
+PARAGRAPHS = [
+    DISCLAIMER,
+    "Der Umsatz stieg im dritten Quartal deutlich an.",
+    "Die Kosten blieben im Vergleich zum Vorjahr stabil.",
+]
+
+
+class MarkerLLM:
+    """Translates by prefixing 'EN:' and keeps the <<n>> segment markers, like a well-behaved model."""
+    def __init__(self, keep_markers=True):
+        self.keep_markers = keep_markers
+        self.messages = []
+
+    def generate(self, message, model_name, instructions, **kwargs):
+        self.messages.append(message)
+        body = message.rsplit("\n\n\n", 1)[-1]
+        segments = re.findall(r"<<(\d+)>>\n(.+)", body)
+        if segments and self.keep_markers:
+            return "\n\n".join(f"<<{n}>>\nEN: {text}" for n, text in segments)
+        return "EN: block"
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "tm.db")
+
+
+def _service(memory, llm):
+    service = TranslationService(llm_type="mock", llm_api_key="mock", translation_memory=memory)
+    service.llm = llm
+    return service
+
+
+def _translate(service, paragraphs):
+    return service.translate(
+        llm_model_name="mock-echo",
+        instructions="Translate.",
+        prompt_inputs={"source_language": "German", "target_language": "English", "pdf_text": "\n\n".join(paragraphs)}
+    )
+
+
+def test_exact_and_fuzzy_hits_survive_reopen(db_path):
+    memory = TranslationMemory(db_path=db_path)
+    memory.store(DISCLAIMER, "This document is confidential.", "German", "English")
+    memory.close()
+
+    reopened = TranslationMemory(db_path=db_path)
+    assert reopened.lookup(DISCLAIMER, "german", "english")["translation"] == "This document is confidential."
+    fuzzy = reopened.lookup(NEAR_DISCLAIMER, "german", "english")
+    assert fuzzy["match"] == "fuzzy" and fuzzy["source_text"] == DISCLAIMER
+    assert reopened.lookup(DISCLAIMER, "german", "french")["match"] is None
+    stats = reopened.get_stats()
+    assert (stats["exact_hits"], stats["fuzzy_hits"], stats["misses"]) == (1, 1, 1)
+    reopened.close()
+
+
+def test_only_new_segments_reach_the_llm(db_path):
+    memory = TranslationMemory(db_path=db_path)
+    llm = MarkerLLM()
+    first = _translate(_service(memory, llm), PARAGRAPHS)
+    assert first["translation"].split("\n\n") == [f"EN: {p}" for p in PARAGRAPHS]
+
+    # A fresh service instance (e.g. per request): all hits, no LLM call, latency savings still reported
+    llm = MarkerLLM()
+    second = _translate(_service(TranslationMemory(db_path=db_path), llm), PARAGRAPHS)
+    assert llm.messages == []
+    assert second["translation"] == first["translation"]
+    assert second["translation_memory"]["exact_hits"] == 3
+    assert second["translation_memory"]["saved_tokens"] > 0
+    assert second["translation_memory"]["saved_seconds"] > 0
+
+
+def test_fuzzy_hint_is_sent_with_new_segment(db_path):
+    memory = TranslationMemory(db_path=db_path)
+    _translate(_service(memory, MarkerLLM()), PARAGRAPHS[:1])
+    llm = MarkerLLM()
+    _translate(_service(memory, llm), [NEAR_DISCLAIMER])
+    assert f"EN: {DISCLAIMER}" in llm.messages[0]
+    assert memory.get_stats()["fuzzy_hits"] == 1
+
+
+def test_marker_parse_failure_keeps_exact_hits(db_path):
+    memory = TranslationMemory(db_path=db_path)
+    _translate(_service(memory, MarkerLLM()), PARAGRAPHS[:1])
+
+    llm = MarkerLLM(keep_markers=False)
+    before = memory.get_stats()
+    response = _translate(_service(memory, llm), [NEAR_DISCLAIMER, PARAGRAPHS[1], PARAGRAPHS[0], PARAGRAPHS[2]])
+    # Exact hit kept in place, the two runs of new segments translated as blocks
+    assert response["translation"].split("\n\n") == ["EN: block", f"EN: {DISCLAIMER}", "EN: block"]
+    assert len(llm.messages) == 3
+    after = response["translation_memory"]
+    assert after["exact_hits"] - before["exact_hits"] == 1
+    assert after["fuzzy_hits"] == before["fuzzy_hits"]
+    # The fuzzy lookup's hint was never sent, so only the exact hit and the two misses count
+    assert after["misses"] - before["misses"] == 2
+    assert after["lookups"] - before["lookups"] == 3